@@ -1,12 +1,47 @@
-import pandas as pd
-from datetime import datetime
+import sys
+
+# Any command line arguments run the headless calculator, before the GUI
+# modules are imported, so it starts as fast as python -m otcalc
+if __name__ == "__main__" and len(sys.argv) > 1:
+    from otcalc.cli import main as cli_main
+    sys.exit(cli_main(sys.argv[1:]))
+
+from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
-from tkcalendar import DateEntry
+import csv
 import math
+import os
+import sqlite3
+from functools import partial
+from itertools import islice
 from tkinter.scrolledtext import ScrolledText
-from tabulate import tabulate
+
+from otcalc.instrument import stage, timed
+from otcalc.importer import DEFAULT_CHUNKSIZE, AppendReader, RunningTotals, write_error_report
+from otcalc import columnar, instrument
+from otcalc.aggregates import EmployeeAggregates, week_key
+from otcalc.db import DEFAULT_DB_PATH, TimecardDB
+from otcalc.engine import store_frame, summarize_days
+from otcalc.holidays import HolidayManager
+from otcalc.rules import DEFAULT_RULES_PATH, compute_entry, format_hhmm, get_rules, load_rules, set_rules
+from otcalc.report import iter_report, write_report
+from otcalc.store import DISPLAY_HEADER, EntryStore, employee_code, employee_name
+from otcalc.tasks import BackgroundTask
+
+# How often the UI checks a background task for messages
+TASK_POLL_MS = 50
+# Delay used to batch table redraws while rows are being added
+VIEW_REFRESH_MS = 20
+# Report pages rendered in the preview at a time
+PREVIEW_PAGES = 5
+# File types offered by the open and save dialogs
+FILE_TYPES = [
+    ("CSV Files", "*.csv"),
+    ("Parquet Files", "*.parquet"),
+    ("Arrow Files", "*.arrow *.feather"),
+]
 
 class TimeEntry(ttk.Frame):
     """Custom time entry widget with hour, minute, and AM/PM selection"""
@@ -44,25 +79,108 @@ class TimeEntry(ttk.Frame):
         """Return time in HH:MM AM/PM format"""
         return f"{self.hour_var.get()}:{self.minute_var.get()} {self.ampm_var.get()}"
 
-class HolidayManager:
-    def __init__(self):
-        self.holidays = set()  # Store holidays as a set of datetime objects
+class VirtualTreeview(ttk.Frame):
+    """Treeview that only materializes the rows currently on screen.
+
+    Rows are read from ``store`` (anything with ``len()`` and
+    ``display_row(index)``); the Treeview holds one item per visible line
+    and those items are refilled as the user scrolls, so the number of Tcl
+    calls depends on the window height, not the data.
+    """
+    def __init__(self, parent, columns, store, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        
+        self.store = store
+        self.selected = set()  # Selected row indices, kept across scrolling
+        self.top = 0           # Index of the first visible row
+        self._refresh_pending = False
+        
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=100)
+        
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.tree.bind("<Configure>", lambda event: self.schedule_refresh())
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll_by(-3 * (event.delta // 120)))
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(3))
     
-    def add_holiday(self, date):
-        """Add a holiday date"""
-        self.holidays.add(date)
+    def visible_count(self):
+        """Number of rows that fit in the widget"""
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # One row's worth of space is taken by the headings
+        return max(1, self.tree.winfo_height() // rowheight - 1)
     
-    def remove_holiday(self, date):
-        """Remove a holiday date"""
-        self.holidays.discard(date)
+    def reset(self):
+        """Forget the selection and scroll position after the store changed"""
+        self.selected.clear()
+        self.top = 0
+        self.schedule_refresh()
     
-    def is_holiday(self, date):
-        """Check if a date is a holiday"""
-        return date in self.holidays
+    def see(self, index):
+        """Scroll so that a row is visible"""
+        count = self.visible_count()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + count:
+            self.top = index - count + 1
+        self.schedule_refresh()
+    
+    def scroll_by(self, lines):
+        self.top += lines
+        self.refresh()
+    
+    def on_scroll(self, action, amount, unit=None):
+        count = self.visible_count()
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.store))
+        elif unit == "pages":
+            self.top += int(amount) * count
+        else:
+            self.top += int(amount)
+        self.refresh()
     
-    def get_holidays(self):
-        """Return list of holidays"""
-        return sorted(list(self.holidays))
+    def on_select(self, event=None):
+        # Replace the selection state of the visible rows only
+        visible = range(self.top, self.top + len(self.tree.get_children()))
+        self.selected.difference_update(visible)
+        self.selected.update(self.top + int(iid) for iid in self.tree.selection())
+    
+    def schedule_refresh(self):
+        """Coalesce redraws requested while a batch of rows is added"""
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after(VIEW_REFRESH_MS, self.refresh)
+    
+    @timed("ui.treeview")
+    def refresh(self):
+        """Fill the visible items from the row store"""
+        self._refresh_pending = False
+        count = self.visible_count()
+        rows = len(self.store)
+        self.top = max(0, min(self.top, rows - count))
+        shown = min(count, rows - self.top)
+        
+        existing = len(self.tree.get_children())
+        for slot in range(existing, shown):
+            self.tree.insert("", "end", iid=str(slot))
+        for slot in range(shown, existing):
+            self.tree.delete(str(slot))
+        
+        for slot in range(shown):
+            self.tree.item(str(slot), values=self.store.display_row(self.top + slot))
+        self.tree.selection_set([str(i - self.top) for i in self.selected if self.top <= i < self.top + shown])
+        
+        if rows:
+            self.scrollbar.set(self.top / rows, (self.top + shown) / rows)
+        else:
+            self.scrollbar.set(0, 1)
 
 class TimeCardApp:
     def __init__(self, root):
@@ -74,14 +192,47 @@ class TimeCardApp:
             pass  # If icon file not found, continue without it
         self.root.geometry("900x700")
         
-        self.total_hours = 0.0
-        self.total_overtime = 0.0
-        self.total_regular_hours = 0.0
+        # Integer-minute totals by employee, day, week, month and pay period
+        self.aggregates = EmployeeAggregates()
+        
+        # Computed entries; the table only renders this store
+        self.entries = EntryStore()
+        
+        # Rows read per chunk when importing CSV files
+        self.import_chunksize = DEFAULT_CHUNKSIZE
+        
+        # Where the last CSV import stopped, for Refresh
+        self.import_state = None
+        
+        # Background task currently running, if any
+        self.task = None
+        
+        # Site overtime rules, if a rules file is present
+        if os.path.exists(DEFAULT_RULES_PATH):
+            try:
+                set_rules(load_rules(DEFAULT_RULES_PATH))
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", f"Could not load overtime rules, using the defaults:\n{e}")
         
         self.holiday_manager = HolidayManager()
+        self.holiday_manager.add_listener(self.reclassify_date)
+        
+        # Entries and holidays persist between sessions
+        try:
+            self.db = TimecardDB(DEFAULT_DB_PATH)
+            for date, description in self.db.load_holidays():
+                self.holiday_manager.add_holiday(date)
+            self.import_state = self.db.last_import_state()
+        except sqlite3.Error:
+            self.db = None
         
         self.setup_styles()
         self.create_ui()
+        
+        if self.db is not None:
+            self.load_month(datetime.now().date())
+        else:
+            self.status_bar.config(text="Could not open the timecard database; entries will not be saved")
     
     def setup_styles(self):
         style = ttk.Style()
@@ -111,6 +262,8 @@ class TimeCardApp:
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
     def create_input_frame(self, parent):
+        from tkcalendar import DateEntry
+        
         input_frame = ttk.LabelFrame(parent, text="Time Entry", padding="10")
         input_frame.pack(fill=tk.X, pady=(0, 10))
 
@@ -132,7 +285,14 @@ class TimeCardApp:
         # Add entry button
         ttk.Button(input_frame, text="Add Entry", command=self.add_entry).grid(row=0, column=6, padx=5, pady=5)
 
+        # Employee ID for new entries
+        ttk.Label(input_frame, text="Employee:").grid(row=1, column=0, padx=5, pady=5)
+        self.employee_entry = ttk.Entry(input_frame, width=14)
+        self.employee_entry.grid(row=1, column=1, padx=5, pady=5)
+
     def create_holiday_frame(self, parent):
+        from tkcalendar import DateEntry
+        
         holiday_frame = ttk.LabelFrame(parent, text="Holiday Management", padding="10")
         holiday_frame.pack(fill=tk.X, pady=(0, 10))
         
@@ -159,8 +319,12 @@ class TimeCardApp:
         if not description:
             messagebox.showwarning("Warning", "Please enter a holiday description")
             return
+        if self.task_busy():
+            return
         
         self.holiday_manager.add_holiday(date)
+        if self.db is not None:
+            self.db.save_holiday(date, description)
         messagebox.showinfo("Success", f"Added holiday: {date.strftime('%Y-%m-%d')} - {description}")
         self.holiday_description.delete(0, tk.END)
     
@@ -197,198 +361,195 @@ class TimeCardApp:
         # Add delete button
         def delete_selected():
             selected = tree.selection()
-            if not selected:
+            if not selected or self.task_busy():
                 return
             
             for item in selected:
                 values = tree.item(item)['values']
                 date = datetime.strptime(values[0], "%Y-%m-%d").date()
                 self.holiday_manager.remove_holiday(date)
+                if self.db is not None:
+                    self.db.delete_holiday(date)
                 tree.delete(item)
         
         ttk.Button(holiday_window, text="Delete Selected", command=delete_selected).pack(pady=10)
     
-    def calculate_hours(self, in_time, out_time, selected_date):
-        fmt = "%I:%M %p"
-        try:
-            in_dt = datetime.strptime(in_time, fmt)
-            out_dt = datetime.strptime(out_time, fmt)
-
-            if out_dt < in_dt:
-                out_dt += pd.Timedelta(days=1)
-
-            time_diff = out_dt - in_dt
-            total_minutes = int(time_diff.total_seconds() // 60)
-
-            selected_date_obj = datetime.strptime(selected_date, "%Y-%m-%d").date()
-            selected_day = selected_date_obj.weekday()
-            
-            # Check if the date is either a weekend or a holiday
-            is_weekend = selected_day in [5, 6]
-            is_holiday = self.holiday_manager.is_holiday(selected_date_obj)
-
-            if is_weekend or is_holiday:
-                regular_minutes = 0
-                # Round down overtime to nearest 15 minutes
-                ot_minutes = (total_minutes // 15) * 15
-            else:
-                regular_minutes = min(465, total_minutes)
-                raw_ot_minutes = max(0, total_minutes - 465)
-                # Apply new overtime rule: only count overtime if the 9th hour is completed
-                if raw_ot_minutes < 60:
-                    ot_minutes = 0
-                else:
-                    # Round down overtime to nearest 15 minutes
-                    ot_minutes = (raw_ot_minutes // 15) * 15
-
-            work_hours = f"{total_minutes // 60:02d}:{total_minutes % 60:02d}"
-            overtime = f"{ot_minutes // 60:02d}:{ot_minutes % 60:02d}"
-
-            return work_hours, overtime, total_minutes, regular_minutes, ot_minutes
-        except ValueError:
-            messagebox.showerror("Error", "Invalid time format")
-            return "00:00", "00:00", 0, 0, 0
+    def reclassify_date(self, date):
+        """Re-apply the rules to the entries a date whose holiday status changed touches.
+        
+        That is the entries on the date, and overnight shifts from the day
+        before, whose hours after midnight fall on it.
+        """
+        ordinal = date.toordinal()
+        ot_day = self.holiday_manager.is_ot_day(date)
+        next_ot_day = self.holiday_manager.is_ot_day(date + timedelta(days=1))
+        rows = [(index, ot_day, next_ot_day if self.entries.crosses_midnight(index) else ot_day)
+                for index in self.entries.indices_on(ordinal)]
+        rows += [(index, bool(self.entries.ot_day[index]), ot_day)
+                 for index in self.entries.indices_on(ordinal - 1) if self.entries.crosses_midnight(index)]
+        changed = [
+            (index, row_ot_day, row_next_ot_day) for index, row_ot_day, row_next_ot_day in rows
+            if bool(self.entries.ot_day[index]) != row_ot_day
+            or self.entries.classify(index, row_ot_day, row_next_ot_day)[2] != self.entries.ot_day_minutes[index]
+        ]
+        if not changed:
+            return
+        
+        def reclassify():
+            for index, row_ot_day, row_next_ot_day in changed:
+                self.entries.set_ot_day(index, row_ot_day, row_next_ot_day)
+        
+        self.update_weeks(self.entries.weeks(index for index, _, _ in changed), reclassify)
+        self.table.schedule_refresh()
+        self.refresh_totals()
     
+    def update_weeks(self, weeks, change=None):
+        """Run ``change`` on the store, then re-apply the rules to whole weeks.
+        
+        ``weeks`` holds the (employee code, Monday ordinal) pairs ``change``
+        touches; with a weekly cap, a row changed there can move minutes
+        between regular and overtime on the other rows of its week. Those
+        rows leave the totals before ``change`` and come back recomputed.
+        """
+        entries = self.entries
+        for index in entries.week_indices(weeks):
+            self.aggregates.remove(entries.employee[index], entries.date[index], *entries.credited(index))
+        if change is not None:
+            change()
+        indices = entries.week_indices(weeks)
+        entries.apply_weekly_cap(indices)
+        for index in indices:
+            self.aggregates.add(entries.employee[index], entries.date[index], *entries.credited(index))
+    
+    @timed("ui.add_entry")
     def add_entry(self):
         selected_date = self.date_picker.get_date().strftime("%Y-%m-%d")
         in_time = self.in_time_entry.get()
         out_time = self.out_time_entry.get()
         
-        work_hours, overtime, total_minutes, regular_minutes, ot_minutes = self.calculate_hours(
-            in_time, out_time, selected_date
-        )
-        
-        # Update totals - convert minutes to hours
-        selected_date_obj = datetime.strptime(selected_date, "%Y-%m-%d").date()
-        is_weekend = selected_date_obj.weekday() in [5, 6]
-        is_holiday = self.holiday_manager.is_holiday(selected_date_obj)
-        
-        if is_weekend or is_holiday:
-            # All hours count as overtime
-            self.total_overtime += total_minutes / 60.0
-            self.total_hours += total_minutes / 60.0
-        else:
-            # Split between regular and overtime
-            regular_hours = regular_minutes / 60.0
-            overtime_hours = ot_minutes / 60.0
-            
-            self.total_regular_hours += regular_hours
-            self.total_overtime += overtime_hours
-            self.total_hours += (regular_hours + overtime_hours)
-        
-        # Format display in HH:MM
-        total_hours_minutes = int(self.total_hours * 60)
-        overtime_minutes = int(self.total_overtime * 60)
-        
-        formatted_totaltime = f"{total_hours_minutes // 60:02d}:{total_hours_minutes % 60:02d}"
-        formatted_overtime = f"{overtime_minutes // 60:02d}:{overtime_minutes % 60:02d}"
-        
-        self.total_label.config(
-            text=f"Total Work Hours: {formatted_totaltime} | Total Overtime: {formatted_overtime}"
-        )
+        try:
+            with stage("ui.calculate_hours"):
+                result = compute_entry(selected_date, in_time, out_time, self.holiday_manager)
+        except ValueError:
+            instrument.count("parse_errors")
+            messagebox.showerror("Error", "Invalid time format")
+            return
         
-        self.tree.insert("", "end", values=(selected_date, in_time, out_time, work_hours, overtime))
+        employee = employee_code(self.employee_entry.get().strip())
+        week = (employee, week_key(self.date_picker.get_date().toordinal()))
+        self.update_weeks({week}, partial(self.entries.append_result, result, employee))
+        if self.db is not None:
+            self.db.add_entries(self.entry_keys([len(self.entries) - 1]))
+        self.refresh_totals()
+        self.table.see(len(self.entries) - 1)
 
     def delete_selected(self):
-        selected_items = self.tree.selection()
+        selected_items = sorted(self.table.selected)
         if not selected_items:
             messagebox.showwarning("Warning", "Please select an entry to delete")
             return
 
-        for item in selected_items:
-            values = self.tree.item(item)['values']
-            if not values or len(values) < 3:
-                messagebox.showerror("Error", "Invalid entry format")
-                continue
-
-            selected_date = values[0]
-            in_time = values[1]
-            out_time = values[2]
-
-            # Recalculate hours for the entry being deleted
-            work_hours, overtime, total_minutes, regular_minutes, ot_minutes = self.calculate_hours(
-                in_time, out_time, selected_date
-            )
-
-            # Subtract the correct amounts based on date type
-            selected_date_obj = datetime.strptime(selected_date, "%Y-%m-%d").date()
-            is_weekend = selected_date_obj.weekday() in [5, 6]
-            is_holiday = self.holiday_manager.is_holiday(selected_date_obj)
-
-            if is_weekend or is_holiday:
-                # All hours were overtime
-                self.total_overtime = max(0, self.total_overtime - (total_minutes / 60.0))
-                self.total_hours = max(0, self.total_hours - (total_minutes / 60.0))
-            else:
-                # Split between regular and overtime
-                regular_hours = regular_minutes / 60.0
-                overtime_hours = ot_minutes / 60.0
-                
-                self.total_regular_hours = max(0, self.total_regular_hours - regular_hours)
-                self.total_overtime = max(0, self.total_overtime - overtime_hours)
-                self.total_hours = max(0, self.total_hours - (regular_hours + overtime_hours))
-
-            # Delete the entry from the treeview
-            self.tree.delete(item)
-
-        # Update display with formatted totals
-        total_hours_minutes = int(self.total_hours * 60)
-        overtime_minutes = int(self.total_overtime * 60)
-        
-        formatted_totaltime = f"{total_hours_minutes // 60:02d}:{total_hours_minutes % 60:02d}"
-        formatted_overtime = f"{overtime_minutes // 60:02d}:{overtime_minutes % 60:02d}"
-        
-        self.total_label.config(
-            text=f"Total Work Hours: {formatted_totaltime} | Total Overtime: {formatted_overtime}"
-        )
+        # Delete the entries from the database, then from the store, taking
+        # their weeks out of the totals and back in without them
+        if self.db is not None:
+            self.db.delete_entries(self.entry_keys(selected_items))
+        self.update_weeks(self.entries.weeks(selected_items), partial(self.entries.delete, selected_items))
+        self.table.reset()
+        self.refresh_totals()
+    
+    def entry_keys(self, indices):
+        """Database keys for rows of the entry store"""
+        entries = self.entries
+        return [
+            (employee_name(entries.employee[i]), entries.date[i], entries.in_minutes[i], entries.out_minutes[i])
+            for i in indices
+        ]
+    
+    def load_month(self, day):
+        """Replace the table with the saved entries for the month of ``day``"""
+        if self.db is None:
+            messagebox.showwarning("Warning", "The timecard database is not available")
+            return
+        if self.task_busy():
+            return
+        self.entries.clear()
+        self.entries.extend(self.db.load_month(None, day.year, day.month, self.holiday_manager))
+        self.aggregates.clear()
+        self.aggregates.add_days(summarize_days(store_frame(self.entries)))
+        self.table.reset()
+        self.refresh_totals()
+        self.status_bar.config(text=f"Loaded {len(self.entries)} entries for {day.strftime('%B %Y')}")
     
     def clear_all(self):
+        if self.task_busy():
+            return
         if messagebox.askyesno("Confirm Clear", "Are you sure you want to clear all entries?"):
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            self.total_hours = 0.0
-            self.total_overtime = 0.0
-            self.total_regular_hours = 0.0
-            self.total_label.config(
-                text=f"Total Work Hours: {self.total_hours:.2f} | Total Overtime: {self.total_overtime:.2f}"
-            )
+            if self.db is not None:
+                self.db.delete_entries(self.entry_keys(range(len(self.entries))))
+            self.entries.clear()
+            self.table.reset()
+            self.aggregates.clear()
+            self.refresh_totals()
+    
+    def employee_totals(self):
+        """Return [(employee, total minutes, overtime minutes)] from the maintained aggregates"""
+        return sorted(
+            (employee_name(code), aggregates.total, aggregates.overtime)
+            for code, aggregates in self.aggregates.employees.items()
+        )
+    
+    def view_employees(self):
+        employee_window = tk.Toplevel(self.root)
+        employee_window.title("Employee Summary")
+        employee_window.geometry("450x300")
+        
+        columns = ("Employee", "Entries", "Work Hours", "Overtime")
+        tree = ttk.Treeview(employee_window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100)
+        
+        for code, aggregates in sorted(self.aggregates.employees.items(), key=lambda item: employee_name(item[0])):
+            tree.insert("", "end", values=(
+                employee_name(code) or "(none)",
+                aggregates.grand[0],
+                format_hhmm(aggregates.total),
+                format_hhmm(aggregates.overtime),
+            ))
+        
+        scrollbar = ttk.Scrollbar(employee_window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscroll=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
+    @timed("ui.print_report")
     def print_report(self):
+        # Pages are generated from a snapshot so later edits don't affect the report
+        entries = self.entries.copy()
+        total_minutes, overtime_minutes = self.aggregates.total, self.aggregates.overtime
+        employee_totals = self.employee_totals()
+        pages = iter_report(entries, total_minutes, overtime_minutes, employee_totals=employee_totals)
+        
         report_window = tk.Toplevel(self.root)
         report_window.title("Time Card Report")
         report_window.geometry("700x500")
 
-        report_text = ScrolledText(report_window, wrap=tk.WORD, width=80, height=20)
+        report_text = ScrolledText(report_window, wrap=tk.NONE, width=80, height=20)
         report_text.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        
+        button_frame = ttk.Frame(report_window)
+        button_frame.pack(pady=10)
 
-        # Report Header
-        report_content = "Time Card Report\n"
-        report_content += "=" * 80 + "\n"
-        report_content += f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-
-        # Table Headers
-        headers = ["Date", "Time In", "Time Out", "Work Hours", "Overtime"]
-        table_data = []
-
-        # Fetch data from treeview
-        for item in self.tree.get_children():
-            values = self.tree.item(item)['values']
-            table_data.append(values)
-
-        # Generate table using tabulate
-        if table_data:
-            report_content += tabulate(table_data, headers=headers, tablefmt="grid")
-        else:
-            report_content += "No records found.\n"
-
-        # Summary Section
-        report_content += f"\n\nSummary:\n"
-        report_content += "=" * 80 + "\n"
-        report_content += f"Total Work Hours: {self.total_hours:.2f} hours\n"
-        report_content += f"Total Overtime Hours: {self.total_overtime:.2f} hours\n"
-
-        report_text.insert(tk.END, report_content)
-        report_text.configure(state='disabled')
+        def show_more():
+            # Render the next few pages only when asked for
+            report_text.configure(state='normal')
+            rendered = 0
+            for page in islice(pages, PREVIEW_PAGES):
+                report_text.insert(tk.END, page + "\n")
+                rendered += 1
+            report_text.configure(state='disabled')
+            if rendered < PREVIEW_PAGES:
+                more_button.state(["disabled"])
 
         def save_report():
             file_path = filedialog.asksaveasfilename(
@@ -396,92 +557,296 @@ class TimeCardApp:
                 filetypes=[("Text Files", "*.txt")],
                 title="Save Report"
             )
-            if file_path:
-                with open(file_path, 'w') as f:
-                    f.write(report_content)
-                messagebox.showinfo("Success", "Report saved successfully!")
+            if file_path and not self.task_busy():
+                task = BackgroundTask(save_report_pages, file_path, entries, total_minutes, overtime_minutes,
+                                      employee_totals)
+                self.run_task(task, "Saving report", on_done=lambda _: self.task_succeeded("Report saved successfully!"))
 
-        ttk.Button(report_window, text="Save Report", command=save_report).pack(pady=10)
+        more_button = ttk.Button(button_frame, text="More Pages", command=show_more)
+        more_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Save Report", command=save_report).pack(side=tk.LEFT, padx=5)
+        
+        show_more()
     
+    @timed("ui.open_file")
     def open_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")], title="Select CSV File")
+        if self.task_busy():
+            return
+        file_path = filedialog.askopenfilename(filetypes=FILE_TYPES, title="Select File")
         if not file_path:
             return
-        try:
-            df = pd.read_csv(file_path)
-            # Clear existing totals
-            self.total_hours = 0.0
-            self.total_overtime = 0.0
-            self.total_regular_hours = 0.0
-            
-            # Clear existing entries
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            for _, row in df.iterrows():
-                work_hours, overtime, total_minutes, regular_minutes, ot_minutes = self.calculate_hours(
-                    row['In Time'], row['Out Time'], row['Date']
-                )
-                
-                selected_date_obj = datetime.strptime(row['Date'], "%Y-%m-%d").date()
-                is_weekend = selected_date_obj.weekday() in [5, 6]
-                is_holiday = self.holiday_manager.is_holiday(selected_date_obj)
-                
-                if is_weekend or is_holiday:
-                    # All hours count as overtime
-                    self.total_overtime += total_minutes / 60.0
-                    self.total_hours += total_minutes / 60.0
+        
+        # Clear existing entries and totals
+        self.entries.clear()
+        self.table.reset()
+        self.aggregates.clear()
+        self.refresh_totals()
+        
+        db_path = self.db.path if self.db is not None else None
+        holidays = set(self.holiday_manager.holidays)
+        self.forget_import_state()
+        if columnar.is_columnar_path(file_path):
+            task = BackgroundTask(import_columnar, file_path, holidays, db_path)
+        else:
+            task = BackgroundTask(import_csv, file_path, holidays, self.import_chunksize, db_path)
+        self.run_task(
+            task, "Importing",
+            on_done=self.import_finished,
+            on_cancel=self.import_finished,
+            handlers={"rows": self.import_rows, "state": self.import_saved},
+            error_text="An error occurred while importing",
+        )
+    
+    @timed("ui.refresh_file")
+    def refresh_file(self):
+        """Import only the punches appended to the last CSV file since it was read"""
+        if self.task_busy():
+            return
+        state = self.import_state
+        if state is None:
+            messagebox.showinfo("Refresh", "Open a CSV file first; Refresh then reads only the rows added to it")
+            return
+        if not os.path.exists(state.path):
+            messagebox.showerror("Error", f"The last imported file no longer exists:\n{state.path}")
+            return
+        
+        db_path = self.db.path if self.db is not None else None
+        task = BackgroundTask(import_csv, state.path, set(self.holiday_manager.holidays),
+                              self.import_chunksize, db_path, state)
+        self.run_task(
+            task, "Refreshing",
+            on_done=self.import_finished,
+            on_cancel=self.import_cancelled,
+            handlers={"rows": self.import_rows, "state": self.import_saved, "restart": self.import_restarted},
+            error_text="An error occurred while refreshing",
+        )
+    
+    def import_saved(self, state):
+        """Remember where the import stopped"""
+        self.import_state = state
+        if self.db is not None:
+            self.db.save_import_state(state)
+    
+    def import_restarted(self, payload=None):
+        """The file was rewritten rather than appended to; it is read again from the start"""
+        self.entries.clear()
+        self.table.reset()
+        self.aggregates.clear()
+        self.refresh_totals()
+    
+    def import_cancelled(self, totals):
+        # Some new rows may already be shown, so the next refresh reads the whole file again
+        self.import_saved(self.import_state._replace(header_hash=""))
+        self.import_finished(totals)
+    
+    def forget_import_state(self):
+        if self.import_state is not None and self.db is not None:
+            self.db.delete_import_state(self.import_state.path)
+        self.import_state = None
+    
+    @timed("ui.import_rows")
+    def import_rows(self, payload):
+        """Show one imported chunk and the running totals so far"""
+        chunk, days = payload
+        weeks = set()
+        if get_rules().weekly_regular_cap_minutes is not None:
+            # Weeks that already had rows, from an earlier import or the
+            # database, were capped by the worker without them
+            for employee, ordinal in days:
+                aggregates = self.aggregates.employees.get(employee)
+                if aggregates is not None and week_key(ordinal) in aggregates.weeks:
+                    weeks.add((employee, week_key(ordinal)))
+        self.entries.extend(chunk)
+        self.aggregates.add_days(days)
+        if weeks:
+            self.update_weeks(weeks)
+        self.table.schedule_refresh()
+        self.refresh_totals()
+    
+    def import_finished(self, totals):
+        imported = totals.rows - len(totals.errors)
+        if self.task.cancelled:
+            self.status_bar.config(text=f"Import cancelled after {imported} rows")
+        else:
+            self.status_bar.config(text=f"Imported {imported} rows, skipped {len(totals.errors)}")
+        if totals.errors:
+            self.save_error_report(totals.errors)
+        elif totals.invalid_rows:
+            messagebox.showerror("Error", f"Invalid time format in {totals.invalid_rows} row(s)")
+    
+    def save_error_report(self, errors):
+        """Offer to save the rows an import skipped, with their line numbers and reasons"""
+        first = errors[0]
+        if not messagebox.askyesno(
+            "Import Errors",
+            f"{len(errors)} row(s) could not be imported and were skipped "
+            f"(first: line {first.line}, {first.reason}).\n\nSave an error report?"
+        ):
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV Files", "*.csv")],
+            title="Save Error Report"
+        )
+        if file_path:
+            try:
+                write_error_report(file_path, errors)
+            except OSError as e:
+                messagebox.showerror("Error", f"Could not save the error report: {e}")
+    
+    @timed("ui.totals")
+    def refresh_totals(self):
+        """Show the maintained totals in the footer label"""
+        # Format display in HH:MM
+        self.total_label.config(
+            text=f"Total Work Hours: {format_hhmm(self.aggregates.total)} | "
+                 f"Total Overtime: {format_hhmm(self.aggregates.overtime)}"
+        )
+    
+    def task_busy(self):
+        """Warn and return True if a background task is still running"""
+        if self.task is not None and self.task.running:
+            messagebox.showwarning("Warning", "Please wait for the current operation to finish or cancel it")
+            return True
+        return False
+    
+    def run_task(self, task, description, on_done, on_cancel=None, handlers=None, error_text="An error occurred"):
+        """Start a background task and poll it from the Tk main loop"""
+        self.task = task
+        self.cancel_button.state(["!disabled"])
+        self.status_bar.config(text=f"{description}...")
+        task.start()
+        self.root.after(TASK_POLL_MS, self.poll_task, task, description, on_done, on_cancel, handlers or {},
+                        error_text)
+    
+    def poll_task(self, task, description, on_done, on_cancel, handlers, error_text):
+        """Handle what ``task`` posted; each task is polled by its own loop"""
+        for kind, payload in task.drain():
+            if kind == "progress":
+                rows, fraction = payload
+                rate = rows / max(task.elapsed(), 1e-6)
+                self.status_bar.config(text=f"{description}... {fraction:.0%} done ({rate:,.0f} rows/s)")
+            elif kind in handlers:
+                handlers[kind](payload)
+            elif kind in ("done", "cancelled", "error"):
+                self.cancel_button.state(["disabled"])
+                self.status_bar.config(text="Ready")
+                if kind == "done":
+                    on_done(payload)
+                elif kind == "cancelled":
+                    if on_cancel:
+                        on_cancel(payload)
+                    else:
+                        self.status_bar.config(text=f"{description} cancelled")
                 else:
-                    # Split between regular and overtime
-                    regular_hours = regular_minutes / 60.0
-                    overtime_hours = ot_minutes / 60.0
-                    
-                    self.total_regular_hours += regular_hours
-                    self.total_overtime += overtime_hours
-                    self.total_hours += (regular_hours + overtime_hours)
-                
-                self.tree.insert("", "end", values=(row['Date'], row['In Time'], row['Out Time'], work_hours, overtime))
-            
-            # Format display in HH:MM
-            total_hours_minutes = int(self.total_hours * 60)
-            overtime_minutes = int(self.total_overtime * 60)
-            
-            formatted_totaltime = f"{total_hours_minutes // 60:02d}:{total_hours_minutes % 60:02d}"
-            formatted_overtime = f"{overtime_minutes // 60:02d}:{overtime_minutes % 60:02d}"
-            
-            self.total_label.config(
-                text=f"Total Work Hours: {formatted_totaltime} | Total Overtime: {formatted_overtime}"
-            )
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while importing: {e}")
+                    messagebox.showerror("Error", f"{error_text}: {payload}")
+                return
+        self.root.after(TASK_POLL_MS, self.poll_task, task, description, on_done, on_cancel, handlers, error_text)
+    
+    def cancel_task(self):
+        if self.task is not None and self.task.running:
+            self.task.cancel()
+            self.status_bar.config(text="Cancelling...")
+    
+    def task_succeeded(self, message):
+        messagebox.showinfo("Success", message)
 
+    @timed("ui.save_to_csv")
     def save_to_csv(self):
+        if self.task_busy():
+            return
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV Files", "*.csv")],
-            title="Save CSV"
+            filetypes=FILE_TYPES,
+            title="Save Data"
         )
         if not file_path:
             return
         
-        try:
-            data = []
-            for item in self.tree.get_children():
-                values = self.tree.item(item)['values']
-                data.append({
-                    "Date": values[0],
-                    "In Time": values[1],
-                    "Out Time": values[2],
-                    "Work Hours": values[3],
-                    "Overtime": values[4]
-                })
-            
-            df = pd.DataFrame(data)
-            df.to_csv(file_path, index=False)
-            messagebox.showinfo("Success", "Data saved successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while saving: {e}")
+        if columnar.is_columnar_path(file_path):
+            task = BackgroundTask(write_columnar, file_path, self.entries.copy())
+        else:
+            task = BackgroundTask(write_csv, file_path, self.entries.copy())
+        self.run_task(
+            task, "Saving",
+            on_done=lambda _: self.task_succeeded("Data saved successfully!"),
+            error_text="An error occurred while saving",
+        )
+
+    def view_diagnostics(self):
+        """Show stage timings, counters and cache hit rates; toggle collection and profiling"""
+        window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("700x500")
+        
+        options = ttk.Frame(window)
+        options.pack(fill=tk.X, padx=10, pady=(10, 0))
+        collecting = tk.BooleanVar(value=instrument.enabled())
+        profiling = tk.BooleanVar(value=instrument.profiling())
+        
+        text = ScrolledText(window, wrap=tk.NONE, width=80, height=20)
+        text.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        
+        def show():
+            text.configure(state='normal')
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, instrument.format_snapshot())
+            summary = instrument.profile_summary()
+            if summary:
+                text.insert(tk.END, "\n\n" + summary)
+            text.configure(state='disabled')
+        
+        def toggle_collecting():
+            if collecting.get():
+                instrument.enable()
+            else:
+                instrument.disable()
+        
+        def toggle_profiling():
+            if profiling.get():
+                instrument.start_profile()
+            else:
+                instrument.stop_profile()
+                show()
+        
+        def reset():
+            instrument.reset()
+            show()
+        
+        def save_json():
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".json",
+                filetypes=[("JSON Files", "*.json")],
+                title="Save Diagnostics"
+            )
+            if file_path:
+                try:
+                    instrument.dump(file_path)
+                except OSError as e:
+                    messagebox.showerror("Error", f"Could not save diagnostics: {e}")
+        
+        def save_profile():
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".prof",
+                filetypes=[("Profile Files", "*.prof")],
+                title="Save Profile"
+            )
+            if file_path and not instrument.save_profile(file_path):
+                messagebox.showwarning("Warning", "No profile has been captured yet")
+        
+        ttk.Checkbutton(options, text="Collect timings", variable=collecting,
+                        command=toggle_collecting).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(options, text="Capture profile", variable=profiling,
+                        command=toggle_profiling).pack(side=tk.LEFT, padx=5)
+        
+        button_frame = ttk.Frame(window)
+        button_frame.pack(pady=(0, 10))
+        ttk.Button(button_frame, text="Refresh", command=show).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Reset", command=reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Save JSON", command=save_json).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Save Profile", command=save_profile).pack(side=tk.LEFT, padx=5)
+        
+        show()
 
     def create_button_frame(self, parent):
         button_frame = ttk.Frame(parent)
@@ -490,39 +855,106 @@ class TimeCardApp:
         # Create buttons
         ttk.Button(button_frame, text="Clear All", command=self.clear_all).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Print Report", command=self.print_report).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Open CSV", command=self.open_file).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Save to CSV", command=self.save_to_csv).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Open File", command=self.open_file).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Refresh", command=self.refresh_file).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Save File", command=self.save_to_csv).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Employees", command=self.view_employees).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Load Month", command=lambda: self.load_month(self.date_picker.get_date())).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Diagnostics", command=self.view_diagnostics).pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_task, state="disabled")
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
 
     def create_tree_frame(self, parent):
         tree_frame = ttk.Frame(parent)
         tree_frame.pack(fill=tk.BOTH, expand=True)
 
-        # Create treeview
-        columns = ("Date", "Time In", "Time Out", "Work Hours", "Overtime")
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
-        
-        # Configure column headings and widths
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100)
-
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
-
-        # Pack tree and scrollbar
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Create virtualized treeview
+        columns = ("Employee", "Date", "Time In", "Time Out", "Work Hours", "Overtime")
+        self.table = VirtualTreeview(tree_frame, columns, self.entries)
+        self.table.pack(fill=tk.BOTH, expand=True)
 
         # Add right-click menu
         self.context_menu = tk.Menu(self.root, tearoff=0)
         self.context_menu.add_command(label="Delete", command=self.delete_selected)
 
         def show_context_menu(event):
-            if self.tree.selection():
+            if self.table.selected:
                 self.context_menu.post(event.x_root, event.y_root)
 
-        self.tree.bind("<Button-3>", show_context_menu)
+        self.table.tree.bind("<Button-3>", show_context_menu)
+
+# Background task targets. These run on a worker thread and must not touch
+# any widget; they report back through task.post().
+
+def import_csv(task, file_path, holidays, chunksize, db_path=None, state=None):
+    """Stream a CSV file, posting each computed chunk and the progress.
+
+    With the ImportState of an earlier import, only the lines appended since
+    are read; if the file was rewritten instead, a "restart" message comes
+    first and the whole file is read. A final "state" message carries the
+    ImportState for the next refresh.
+
+    Bad rows are left out and collected in ``totals.errors``. When
+    ``db_path`` is given, every chunk is also saved to the database.
+    """
+    totals = RunningTotals()
+    errors = []
+    db = TimecardDB(db_path) if db_path else None
+    try:
+        with AppendReader(file_path, state) as reader:
+            if state is not None and not reader.appended:
+                task.post("restart")
+            for result in reader.iter_chunks(holidays, chunksize, errors):
+                if task.cancelled:
+                    break
+                totals.add_frame(result)
+                totals.add_errors(errors)
+                errors.clear()
+                with stage("import.store"):
+                    chunk = EntryStore.from_frame(result)
+                    days = summarize_days(result)
+                if db is not None:
+                    with stage("import.db"):
+                        db.add_store(chunk)
+                task.post("rows", (chunk, days))
+                task.post("progress", (totals.rows, reader.fraction()))
+            if not task.cancelled:
+                task.post("state", reader.state())
+    finally:
+        if db is not None:
+            db.close()
+    return totals
+
+def import_columnar(task, file_path, holidays, db_path=None):
+    """Load a Parquet or Arrow file in one go; times are already integers"""
+    with stage("import.columnar"):
+        result = columnar.load_frame(file_path, holidays)
+    totals = RunningTotals()
+    totals.add_frame(result)
+    chunk = EntryStore.from_frame(result)
+    if db_path:
+        db = TimecardDB(db_path)
+        try:
+            db.add_store(chunk)
+        finally:
+            db.close()
+    task.post("rows", (chunk, summarize_days(result)))
+    return totals
+
+@timed("export.columnar")
+def write_columnar(task, file_path, entries):
+    columnar.save(entries, file_path)
+
+@timed("export.csv")
+def write_csv(task, file_path, entries):
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(DISPLAY_HEADER)
+        writer.writerows(entries.iter_display())
+
+@timed("report.save")
+def save_report_pages(task, file_path, entries, total_minutes, overtime_minutes, employee_totals):
+    write_report(file_path, iter_report(entries, total_minutes, overtime_minutes, employee_totals=employee_totals))
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,312 @@
+"""Benchmarks for the calculation, import, export and report paths.
+
+Runs headless: the app script is imported for its worker functions (the
+ones ``open_file``, ``save_to_csv`` and ``print_report`` hand to a
+background task), but no window is ever created, so no display is needed.
+Punches are synthetic: a year of mixed weekdays, weekends and holidays, a
+share of overnight shifts, spread over a few dozen employees.
+
+Usage::
+
+    python benchmarks/bench.py                          # 1k, 10k and 100k rows
+    python benchmarks/bench.py --rows 1M,10M --paths import,export
+    python benchmarks/bench.py --save-baseline baseline.json
+    python benchmarks/bench.py --compare baseline.json  # exit 1 on a regression
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from otcalc.aggregates import EmployeeAggregates  # noqa: E402
+from otcalc.engine import compute_frame  # noqa: E402
+from otcalc.report import iter_report, write_report  # noqa: E402
+from otcalc.rules import compute_entry, format_time  # noqa: E402
+from otcalc.store import EntryStore, employee_name  # noqa: E402
+
+PATHS = ("calc", "import", "export", "report")
+DEFAULT_ROWS = "1k,10k,100k"
+SCALAR_SAMPLE = 100_000       # rows timed one by one through compute_entry
+REGRESSION_TOLERANCE = 0.20   # flag a path more than 20% slower than the baseline
+
+YEAR_START = date(2024, 1, 1)
+HOLIDAYS = frozenset(YEAR_START + timedelta(days=d) for d in (0, 45, 88, 121, 185, 244, 303, 327, 358, 359))
+EMPLOYEES = 40
+
+
+def parse_count(value):
+    """Parse a row count such as 5000, 10k or 2M"""
+    value = value.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value[:-1] if scale > 1 else value) * scale)
+
+
+def generate_punches(rows, seed=0, overnight_share=0.15):
+    """Return a DataFrame of synthetic Employee / Date / In Time / Out Time punches.
+
+    Day shifts start between 6 and 10 AM, overnight shifts between 6 and
+    11 PM and run past midnight; shift lengths are 4 to 12 hours.
+    """
+    rng = np.random.default_rng(seed)
+    dates = np.array([(YEAR_START + timedelta(days=d)).isoformat() for d in range(366)], dtype=object)
+    times = np.array([format_time(m) for m in range(24 * 60)], dtype=object)
+    names = np.array([f"E{1000 + i}" for i in range(EMPLOYEES)], dtype=object)
+
+    overnight = rng.random(rows) < overnight_share
+    start = np.where(overnight, rng.integers(18 * 60, 23 * 60, rows), rng.integers(6 * 60, 10 * 60, rows))
+    start -= start % 5
+    length = rng.integers(4 * 12, 12 * 12, rows) * 5
+    return pd.DataFrame({
+        "Employee": names[rng.integers(0, EMPLOYEES, rows)],
+        "Date": dates[rng.integers(0, len(dates), rows)],
+        "In Time": times[start],
+        "Out Time": times[(start + length) % (24 * 60)],
+    })
+
+
+class SinkTask:
+    """Stands in for BackgroundTask: the target runs inline, and posted
+    chunks are folded into a store and aggregates as ``import_rows`` does.
+    """
+    cancelled = False
+
+    def __init__(self):
+        self.entries = EntryStore()
+        self.aggregates = EmployeeAggregates()
+        self.marks = []
+
+    def post(self, kind, payload=None):
+        if kind == "rows":
+            chunk, days = payload
+            self.entries.extend(chunk)
+            self.aggregates.add_days(days)
+            self.marks.append(time.perf_counter())
+
+
+def load_app():
+    """Import the app script (its file name is not a module name)"""
+    path = os.path.join(ROOT, "OT time-calculate.py")
+    spec = importlib.util.spec_from_file_location("ot_time_calculate", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Workload:
+    """Synthetic punches for one size, with the files and state each path needs"""
+    def __init__(self, app, rows, workdir, chunksize):
+        self.app = app
+        self.rows = rows
+        self.chunksize = chunksize
+        self.frame = generate_punches(rows)
+        self.csv_path = os.path.join(workdir, f"punches_{rows}.csv")
+        self.frame.to_csv(self.csv_path, index=False)
+        self.out_dir = workdir
+        self._imported = None
+
+    def imported(self):
+        """The store and aggregates of an import, for the export and report paths"""
+        if self._imported is None:
+            task = SinkTask()
+            self.app.import_csv(task, self.csv_path, HOLIDAYS, self.chunksize)
+            self._imported = task
+        return self._imported
+
+
+def bench_calc(work):
+    """compute_entry row by row (what add_entry calls), then the vectorized engine"""
+    sample = work.frame.iloc[:SCALAR_SAMPLE]
+    latencies = []
+    clock = time.perf_counter
+    for _, day, in_time, out_time in sample.itertuples(index=False):
+        started = clock()
+        compute_entry(day, in_time, out_time, HOLIDAYS)
+        latencies.append(clock() - started)
+    started = clock()
+    compute_frame(work.frame, HOLIDAYS)
+    return work.rows, clock() - started, latencies, "row"
+
+
+def bench_import(work):
+    """import_csv into a store and aggregates, as open_file runs it"""
+    task = SinkTask()
+    started = time.perf_counter()
+    work.app.import_csv(task, work.csv_path, HOLIDAYS, work.chunksize)
+    elapsed = time.perf_counter() - started
+    marks = [started] + task.marks
+    return len(task.entries), elapsed, [b - a for a, b in zip(marks, marks[1:])], "chunk"
+
+
+def bench_export(work):
+    """write_csv, and write_columnar to Parquet when pyarrow is installed"""
+    entries = work.imported().entries
+    latencies = []
+    started = time.perf_counter()
+    work.app.write_csv(None, os.path.join(work.out_dir, "export.csv"), entries)
+    latencies.append(time.perf_counter() - started)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        mark = time.perf_counter()
+        work.app.write_columnar(None, os.path.join(work.out_dir, "export.parquet"), entries)
+        latencies.append(time.perf_counter() - mark)
+    return len(entries) * len(latencies), time.perf_counter() - started, latencies, "file"
+
+
+def bench_report(work):
+    """The whole report written page by page, as print_report's Save Report does"""
+    imported = work.imported()
+    aggregates = imported.aggregates
+    employee_totals = sorted(
+        (employee_name(code), bucket.total, bucket.overtime) for code, bucket in aggregates.employees.items()
+    )
+    marks = []
+
+    def timed(pages):
+        for page in pages:
+            yield page
+            marks.append(time.perf_counter())
+
+    started = time.perf_counter()
+    pages = iter_report(imported.entries, aggregates.total, aggregates.overtime, employee_totals=employee_totals)
+    write_report(os.path.join(work.out_dir, "report.txt"), timed(pages))
+    elapsed = time.perf_counter() - started
+    marks = [started] + marks
+    return len(imported.entries), elapsed, [b - a for a, b in zip(marks, marks[1:])], "page"
+
+
+BENCHMARKS = {"calc": bench_calc, "import": bench_import, "export": bench_export, "report": bench_report}
+
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+def run_path(name, work, repeat, measure_memory):
+    """Best-of-``repeat`` throughput, latency percentiles and peak traced memory"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        rows, elapsed, latencies, unit = BENCHMARKS[name](work)
+        if best is None or elapsed < best[1]:
+            best = rows, elapsed, latencies, unit
+    rows, elapsed, latencies, unit = best
+
+    peak_mb = None
+    if measure_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            BENCHMARKS[name](work)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "path": name,
+        "rows": work.rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else 0.0,
+        "latency_unit": unit,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_mb": peak_mb,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return messages for paths that got slower than the baseline allows"""
+    previous = {(r["path"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["path"], result["rows"]))
+        if before is None or not before["rows_per_sec"]:
+            continue
+        change = result["rows_per_sec"] / before["rows_per_sec"] - 1
+        if change < -tolerance:
+            regressions.append(
+                f"{result['path']} @ {result['rows']} rows: {result['rows_per_sec']:,.0f} rows/s, "
+                f"{-change:.0%} slower than the baseline ({before['rows_per_sec']:,.0f} rows/s)"
+            )
+    return regressions
+
+
+def format_row(result):
+    peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f}"
+    return (f"{result['path']:<8}{result['rows']:>11,}{result['rows_per_sec']:>15,.0f}"
+            f"{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            f"  {result['latency_unit']:<6}{peak:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the calculation, import, export and report paths")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help=f"comma-separated sizes, e.g. 1k,1M,10M (default: {DEFAULT_ROWS})")
+    parser.add_argument("--paths", default=",".join(PATHS), help=f"comma-separated subset of {', '.join(PATHS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path; the fastest is reported (default: 3)")
+    parser.add_argument("--chunksize", type=int, default=None, help="rows per import chunk (default: the app's)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results to a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help=f"slowdown allowed before a regression is flagged (default: {REGRESSION_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_count(value) for value in args.rows.split(",")]
+    paths = [name.strip() for name in args.paths.split(",")]
+    unknown = set(paths) - set(PATHS)
+    if unknown:
+        parser.error(f"unknown path(s): {', '.join(sorted(unknown))}")
+    app = load_app()
+    chunksize = args.chunksize or app.DEFAULT_CHUNKSIZE
+
+    print(f"{'path':<8}{'rows':>11}{'rows/s':>15}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  {'per':<6}{'peak MB':>9}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="otcalc-bench-") as workdir:
+        for rows in sizes:
+            work = Workload(app, rows, workdir, chunksize)
+            for name in paths:
+                result = run_path(name, work, args.repeat, not args.no_memory)
+                results.append(result)
+                print(format_row(result), flush=True)
+            del work
+            gc.collect()
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION: {message}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+"""Overtime calculation library used by the Time Calculator app.
+
+Importing the package only loads the pure-Python rules; the pandas-based
+engine lives in ``otcalc.engine`` and is imported on demand.
+"""
+from otcalc.holidays import HolidayManager
+from otcalc.rules import (
+    EntryError,
+    EntryResult,
+    compute_entries,
+    compute_entry,
+    credited_minutes,
+    format_hhmm,
+    split_minutes,
+    split_shift,
+)
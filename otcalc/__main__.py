@@ -0,0 +1,5 @@
+import sys
+
+from otcalc.cli import main
+
+sys.exit(main())
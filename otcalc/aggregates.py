@@ -0,0 +1,171 @@
+"""Exact integer-minute totals by day, week, month and pay period.
+
+Every bucket holds ``[rows, total, regular, overtime]`` in minutes. Adding
+or removing an entry touches one bucket per level, so totals never need a
+rescan and never drift the way float hours do. ``EmployeeAggregates`` keeps
+one set of buckets per employee next to the overall one, so per-employee
+totals are dictionary lookups. ``verify`` recomputes everything from an
+EntryStore to check the running state.
+"""
+from datetime import date
+
+# Pay periods are counted in fixed blocks from this Monday
+PAY_PERIOD_ANCHOR = date(2024, 1, 1).toordinal()
+PAY_PERIOD_DAYS = 14
+
+
+def week_key(ordinal):
+    """Ordinal of the Monday starting the week"""
+    return ordinal - (ordinal - 1) % 7
+
+
+def month_key(ordinal):
+    """(year, month) of a date ordinal"""
+    d = date.fromordinal(ordinal)
+    return d.year, d.month
+
+
+def day_totals(store):
+    """Group a store's credited minutes by employee and date, row by row.
+
+    Returns {(employee code, ordinal): [rows, total, regular, overtime]}.
+    This is the reference ``verify`` checks against; imports group their
+    frames with the vectorized ``otcalc.engine.summarize_days``.
+    """
+    days = {}
+    for employee, ordinal, total, regular, overtime in store.iter_credited():
+        key = (employee, ordinal)
+        bucket = days.get(key)
+        if bucket is None:
+            days[key] = [1, total, regular, overtime]
+        else:
+            bucket[0] += 1
+            bucket[1] += total
+            bucket[2] += regular
+            bucket[3] += overtime
+    return days
+
+
+class Aggregates:
+    """Running totals partitioned by period"""
+    def __init__(self, pay_period_days=PAY_PERIOD_DAYS, pay_period_anchor=PAY_PERIOD_ANCHOR):
+        self.pay_period_days = pay_period_days
+        self.pay_period_anchor = pay_period_anchor
+        self.clear()
+    
+    def clear(self):
+        self.grand = [0, 0, 0, 0]
+        self.days = {}
+        self.weeks = {}
+        self.months = {}
+        self.periods = {}
+        self._month_keys = {}
+    
+    def period_key(self, ordinal):
+        """Ordinal of the first day of the pay period"""
+        offset = (ordinal - self.pay_period_anchor) // self.pay_period_days
+        return self.pay_period_anchor + offset * self.pay_period_days
+    
+    def add(self, ordinal, total, regular, overtime, rows=1):
+        """Add an entry's credited minutes to every level"""
+        delta = (rows, total, regular, overtime)
+        month = self._month_keys.get(ordinal)
+        if month is None:
+            month = self._month_keys[ordinal] = month_key(ordinal)
+        self._apply(self.grand, delta)
+        self._bump(self.days, ordinal, delta)
+        self._bump(self.weeks, week_key(ordinal), delta)
+        self._bump(self.months, month, delta)
+        self._bump(self.periods, self.period_key(ordinal), delta)
+    
+    def remove(self, ordinal, total, regular, overtime, rows=1):
+        """Undo an earlier add"""
+        self.add(ordinal, -total, -regular, -overtime, -rows)
+    
+    def __eq__(self, other):
+        return (
+            self.grand == other.grand
+            and self.days == other.days
+            and self.weeks == other.weeks
+            and self.months == other.months
+            and self.periods == other.periods
+        )
+    
+    @property
+    def total(self):
+        return self.grand[1]
+    
+    @property
+    def regular(self):
+        return self.grand[2]
+    
+    @property
+    def overtime(self):
+        return self.grand[3]
+    
+    @staticmethod
+    def _apply(bucket, delta):
+        for i, value in enumerate(delta):
+            bucket[i] += value
+    
+    def _bump(self, level, key, delta):
+        bucket = level.get(key)
+        if bucket is None:
+            level[key] = list(delta)
+            return
+        self._apply(bucket, delta)
+        if bucket[0] == 0:
+            del level[key]
+
+
+class EmployeeAggregates:
+    """Aggregates for everyone plus one Aggregates per employee code"""
+    def __init__(self, pay_period_days=PAY_PERIOD_DAYS, pay_period_anchor=PAY_PERIOD_ANCHOR):
+        self.pay_period_days = pay_period_days
+        self.pay_period_anchor = pay_period_anchor
+        self.clear()
+    
+    def clear(self):
+        self.all = Aggregates(self.pay_period_days, self.pay_period_anchor)
+        self.employees = {}
+    
+    def employee(self, code):
+        """Return the Aggregates of one employee (empty if unknown)"""
+        aggregates = self.employees.get(code)
+        if aggregates is None:
+            aggregates = self.employees[code] = Aggregates(self.pay_period_days, self.pay_period_anchor)
+        return aggregates
+    
+    def add(self, employee, ordinal, total, regular, overtime, rows=1):
+        self.all.add(ordinal, total, regular, overtime, rows)
+        aggregates = self.employee(employee)
+        aggregates.add(ordinal, total, regular, overtime, rows)
+        if aggregates.grand[0] == 0:
+            del self.employees[employee]
+    
+    def remove(self, employee, ordinal, total, regular, overtime, rows=1):
+        """Undo an earlier add"""
+        self.add(employee, ordinal, -total, -regular, -overtime, -rows)
+    
+    def add_days(self, days):
+        """Fold in per-employee, per-day totals from day_totals()"""
+        for (employee, ordinal), (rows, total, regular, overtime) in days.items():
+            self.add(employee, ordinal, total, regular, overtime, rows)
+    
+    def verify(self, store):
+        """Return True if the running totals match a full recompute of store"""
+        fresh = EmployeeAggregates(self.pay_period_days, self.pay_period_anchor)
+        fresh.add_days(day_totals(store))
+        return fresh.all == self.all and fresh.employees == self.employees
+    
+    @property
+    def total(self):
+        return self.all.total
+    
+    @property
+    def regular(self):
+        return self.all.regular
+    
+    @property
+    def overtime(self):
+        return self.all.overtime
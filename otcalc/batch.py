@@ -0,0 +1,175 @@
+"""Parallel month-end payroll run over many employee CSV files.
+
+Each CSV holds one employee's punches and is named after the employee
+(``E1042.csv``). Files are spread over a process pool; every worker streams
+its file through the vectorized engine and returns per-day totals, which
+are written as one summary table per employee plus a combined summary.
+
+Usage::
+
+    python -m otcalc.batch punches/ --holidays holidays.txt --out summaries/
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from otcalc.importer import DEFAULT_CHUNKSIZE, write_error_report
+from otcalc.holidays import load_holiday_file
+from otcalc.rules import format_hhmm, get_rules, load_rules, set_rules
+
+SUMMARY_HEADER = ["Employee", "Rows", "Invalid Rows", "Work Hours", "Regular Hours", "Overtime"]
+DAILY_HEADER = ["Date", "Work Hours", "Regular Hours", "Overtime"]
+
+_holidays = frozenset()
+
+
+def expand_inputs(inputs):
+    """Expand directories and glob patterns into a sorted list of CSV paths"""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.update(glob.glob(os.path.join(item, "*.csv")))
+        else:
+            matches = glob.glob(item)
+            paths.update(matches if matches else [item])
+    return sorted(paths)
+
+
+def _init_worker(holidays, rules=None):
+    global _holidays
+    _holidays = frozenset(holidays)
+    set_rules(rules)
+
+
+def process_file(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Compute one employee file.
+
+    Returns (employee, summary, daily, error). ``daily`` maps each date
+    string to its credited (total, regular, overtime) minutes; bad rows are
+    skipped and listed in ``summary["errors"]``.
+    """
+    import pandas as pd
+    from otcalc.engine import credited_columns
+    from otcalc.importer import RunningTotals, iter_chunks
+
+    employee = os.path.splitext(os.path.basename(path))[0]
+    try:
+        totals = RunningTotals()
+        errors = []
+        daily = None
+        for result in iter_chunks(path, _holidays, chunksize, errors):
+            totals.add_frame(result)
+            totals.add_errors(errors)
+            errors.clear()
+            total, regular, overtime = credited_columns(result)
+            per_day = pd.DataFrame({
+                "Date": result["Date"].to_numpy(),
+                "total": total,
+                "regular": regular,
+                "overtime": overtime,
+            }).groupby("Date", sort=False).sum()
+            daily = per_day if daily is None else daily.add(per_day, fill_value=0)
+    except Exception as e:
+        return employee, None, None, f"{path}: {e}"
+
+    days = {}
+    if daily is not None:
+        for date, row in daily.sort_index().iterrows():
+            days[date] = (int(row["total"]), int(row["regular"]), int(row["overtime"]))
+    summary = totals.as_dict()
+    summary["errors"] = totals.errors
+    return employee, summary, days, None
+
+
+def run_batch(paths, holidays=(), workers=None, chunksize=DEFAULT_CHUNKSIZE, rules=None):
+    """Process files in parallel, returning results in input order.
+
+    Workers use ``rules``, or the RuleSet in use in this process.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(frozenset(holidays), rules or get_rules())) as executor:
+        return list(executor.map(process_file, paths, [chunksize] * len(paths)))
+
+
+def write_daily(path, days):
+    """Write one employee's per-day summary table"""
+    totals = [0, 0, 0]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(DAILY_HEADER)
+        for date, minutes in days.items():
+            writer.writerow([date] + [format_hhmm(m) for m in minutes])
+            totals = [t + m for t, m in zip(totals, minutes)]
+        writer.writerow(["Total"] + [format_hhmm(m) for m in totals])
+
+
+def write_summary(path, results):
+    """Write the combined summary, one row per employee plus a total row"""
+    combined = {"rows": 0, "invalid_rows": 0, "total": 0, "regular": 0, "overtime": 0}
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_HEADER)
+        for employee, summary, _, error in results:
+            if error:
+                continue
+            for key in combined:
+                combined[key] += summary[key]
+            writer.writerow(_summary_row(employee, summary))
+        writer.writerow(_summary_row("Total", combined))
+    return combined
+
+
+def _summary_row(name, summary):
+    return [
+        name, summary["rows"], summary["invalid_rows"],
+        format_hhmm(summary["total"]), format_hhmm(summary["regular"]), format_hhmm(summary["overtime"]),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m otcalc.batch", description="Month-end overtime batch run")
+    parser.add_argument("inputs", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("--holidays", help="file with one YYYY-MM-DD holiday per line")
+    parser.add_argument("--out", default="summaries", help="output directory (default: summaries)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows read per chunk")
+    parser.add_argument("--rules", help="TOML or JSON file of overtime rules (default: the built-in rules)")
+    args = parser.parse_args(argv)
+
+    if args.rules:
+        try:
+            set_rules(load_rules(args.rules))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no CSV files found")
+    holidays = load_holiday_file(args.holidays) if args.holidays else set()
+
+    results = run_batch(paths, holidays, args.workers, args.chunksize)
+
+    os.makedirs(args.out, exist_ok=True)
+    failed = 0
+    for employee, summary, days, error in results:
+        if error:
+            print(error, file=sys.stderr)
+            failed += 1
+            continue
+        write_daily(os.path.join(args.out, f"{employee}.csv"), days)
+        if summary["errors"]:
+            write_error_report(os.path.join(args.out, f"{employee}_errors.csv"), summary["errors"])
+            print(f"{employee}: skipped {len(summary['errors'])} bad row(s), see {employee}_errors.csv",
+                  file=sys.stderr)
+    combined = write_summary(os.path.join(args.out, "summary.csv"), results)
+
+    print(f"Processed {len(paths) - failed} of {len(paths)} file(s), {combined['rows']} row(s)")
+    print(f"Total Work Hours: {format_hhmm(combined['total'])} | Total Overtime: {format_hhmm(combined['overtime'])}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
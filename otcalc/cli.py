@@ -0,0 +1,128 @@
+"""Headless command line for overtime calculation.
+
+Reads Date / In Time / Out Time CSV punches from files or stdin and writes
+totals or per-row results to stdout. Only the standard library and the pure
+rules are imported, so a small job starts in a few tens of milliseconds;
+the pandas-based batch mode is loaded only when asked for.
+
+Usage::
+
+    python -m otcalc punches.csv                 # totals
+    cat punches.csv | python -m otcalc --rows    # per-row results as CSV
+    python -m otcalc batch punches/ --out summaries/
+"""
+import argparse
+import csv
+import sys
+
+from otcalc import instrument
+from otcalc.holidays import load_holiday_file
+from otcalc.rules import WeeklyCap, compute_entry, credited_minutes, format_hhmm, get_rules, load_rules, set_rules
+
+ROW_HEADER = ["Employee", "Date", "In Time", "Out Time", "Work Hours", "Regular Hours", "Overtime"]
+
+
+def open_input(name):
+    if name == "-":
+        return sys.stdin
+    return open(name, newline="")
+
+
+def process(f, name, holidays, totals, writer=None, weekly_cap=None):
+    """Compute every row of one CSV input, reporting bad rows on stderr.
+
+    ``totals`` maps employee ID -> [rows, total, regular, overtime, night]
+    and is updated in place; the Employee column is optional.
+    """
+    errors = 0
+    reader = csv.DictReader(f)
+    for row in reader:
+        try:
+            result = compute_entry(row["Date"], row["In Time"], row["Out Time"], holidays)
+        except (KeyError, TypeError, ValueError) as e:
+            # line_num is the line the row ended on, past blank lines and quoted newlines
+            print(f"{name}:{reader.line_num}: {e}", file=sys.stderr)
+            errors += 1
+            instrument.count("parse_errors")
+            continue
+        instrument.count("rows")
+        employee = row.get("Employee") or ""
+        if weekly_cap is not None:
+            result = weekly_cap.apply_result(result, employee)
+        bucket = totals.setdefault(employee, [0, 0, 0, 0, 0])
+        bucket[0] += 1
+        for i, minutes in enumerate(credited_minutes(result), start=1):
+            bucket[i] += minutes
+        bucket[4] += result.night_minutes
+        if writer is not None:
+            writer.writerow([
+                employee, result.date, result.in_time, result.out_time,
+                format_hhmm(result.total_minutes), format_hhmm(result.regular_minutes),
+                format_hhmm(result.ot_minutes),
+            ])
+    return errors
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "batch":
+        from otcalc import batch
+        return batch.main(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="python -m otcalc", description="Overtime calculator")
+    parser.add_argument("inputs", nargs="*", default=["-"], help="CSV files to read ('-' for stdin, the default)")
+    parser.add_argument("--holidays", help="file with one YYYY-MM-DD holiday per line")
+    parser.add_argument("--rows", action="store_true", help="write per-row results as CSV instead of totals")
+    parser.add_argument("--by-employee", action="store_true", help="also print totals for each employee")
+    parser.add_argument("--rules", help="TOML or JSON file of overtime rules (default: the built-in rules)")
+    parser.add_argument("--stats", metavar="FILE", help="write stage timings and counters to FILE as JSON")
+    parser.add_argument("--profile", action="store_true", help="include a cProfile summary in --stats")
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        instrument.enable()
+        if args.profile:
+            instrument.start_profile()
+
+    if args.rules:
+        try:
+            set_rules(load_rules(args.rules))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    night = get_rules().night_table is not None
+    holidays = load_holiday_file(args.holidays) if args.holidays else set()
+    writer = None
+    if args.rows:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(ROW_HEADER)
+
+    totals = {}
+    errors = 0
+    weekly_cap = WeeklyCap.for_rules()
+    for name in args.inputs:
+        f = open_input(name)
+        try:
+            with instrument.stage("cli.process"):
+                errors += process(f, name, holidays, totals, writer, weekly_cap)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    if not args.rows:
+        grand = [sum(bucket[i] for bucket in totals.values()) for i in range(5)]
+        if args.by_employee:
+            for employee in sorted(totals):
+                rows, total, regular, overtime, night_minutes = totals[employee]
+                line = (f"{employee or '(none)'}: {rows} rows | Work {format_hhmm(total)} | "
+                        f"Regular {format_hhmm(regular)} | Overtime {format_hhmm(overtime)}")
+                print(line + (f" | Night {format_hhmm(night_minutes)}" if night else ""))
+        print(f"Rows: {grand[0]}")
+        print(f"Total Work Hours: {format_hhmm(grand[1])}")
+        print(f"Regular Hours: {format_hhmm(grand[2])}")
+        print(f"Total Overtime: {format_hhmm(grand[3])}")
+        if night:
+            print(f"Night Hours: {format_hhmm(grand[4])}")
+    if args.stats:
+        instrument.stop_profile()
+        instrument.dump(args.stats)
+    return 1 if errors else 0
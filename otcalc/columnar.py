@@ -0,0 +1,129 @@
+"""Parquet and Arrow IPC export/import for the entry store.
+
+Dates are written as Arrow ``date32`` and times and durations as integer
+minutes, so reloading needs no string parsing. Arrow IPC files are written
+uncompressed so they can be memory-mapped; both formats support reading
+just the columns that are needed. Requires pyarrow, which is imported on
+first use.
+"""
+import os
+
+from otcalc.store import EntryStore, employee_name
+
+# Days between date.toordinal() and the Unix epoch used by date32
+EPOCH_ORDINAL = 719163
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+# File column -> EntryStore column
+COLUMN_MAP = {
+    "Date": "date",
+    "In Minutes": "in_minutes",
+    "Out Minutes": "out_minutes",
+    "Work Minutes": "total",
+    "Regular Minutes": "regular",
+    "Overtime Minutes": "overtime",
+    "OT Day": "ot_day",
+    "Employee": "employee",
+    "OT Day Minutes": "ot_day_minutes",
+    "Night Minutes": "night_minutes",
+}
+
+
+def is_columnar_path(path):
+    return os.path.splitext(path)[1].lower() in PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+
+def store_to_table(store):
+    """Build a pyarrow Table from an EntryStore without copying through Python objects"""
+    import numpy as np
+    import pyarrow as pa
+
+    arrays = []
+    for name, column in COLUMN_MAP.items():
+        values = np.frombuffer(getattr(store, column), dtype=f"i{getattr(store, column).itemsize}")
+        if name == "Date":
+            arrays.append(pa.array(values - EPOCH_ORDINAL, type=pa.int32()).cast(pa.date32()))
+        elif name == "Employee":
+            # Dictionary-encode with only the IDs this store uses
+            codes, inverse = np.unique(values, return_inverse=True)
+            names = pa.array([employee_name(int(code)) for code in codes], type=pa.string())
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(inverse.astype(np.int32)), names))
+        elif name == "OT Day":
+            arrays.append(pa.array(values.astype(bool)))
+        else:
+            arrays.append(pa.array(values))
+    return pa.Table.from_arrays(arrays, names=list(COLUMN_MAP))
+
+
+def save(store, path):
+    """Write an EntryStore as Parquet or Arrow IPC, chosen by file extension"""
+    table = store_to_table(store)
+    if os.path.splitext(path)[1].lower() in PARQUET_EXTENSIONS:
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, path, compression="uncompressed")
+
+
+def read_table(path, columns=None):
+    """Read a pyarrow Table, memory-mapped and limited to ``columns`` if given"""
+    if os.path.splitext(path)[1].lower() in PARQUET_EXTENSIONS:
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns, memory_map=True)
+    import pyarrow.feather as feather
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+
+def read_schema(path):
+    """Read only the schema of a file"""
+    if os.path.splitext(path)[1].lower() in PARQUET_EXTENSIONS:
+        import pyarrow.parquet as pq
+        return pq.read_schema(path, memory_map=True)
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema
+
+
+def read_frame(path, columns=None):
+    """Read selected columns into a DataFrame, e.g. ``read_frame(p, ["Date", "Overtime Minutes"])``"""
+    return read_table(path, columns).to_pandas(date_as_object=False)
+
+
+def load_frame(path, holidays=()):
+    """Load a file as a computed frame (see otcalc.engine.compute_minutes).
+
+    Only the date, in/out and employee columns are read; the rest is
+    recomputed so the result reflects the current holiday calendar and
+    rules.
+    """
+    import numpy as np
+    from otcalc.engine import apply_weekly_cap, compute_minutes, employee_codes
+    from otcalc.rules import WeeklyCap
+
+    columns = ["Date", "In Minutes", "Out Minutes"]
+    if "Employee" in read_schema(path).names:
+        columns.append("Employee")
+    table = read_table(path, columns)
+    ordinals = table.column("Date").cast("int32").to_numpy().astype(np.int64) + EPOCH_ORDINAL
+    employees = None
+    if "Employee" in columns:
+        employees = employee_codes(table.column("Employee").to_pandas())
+    result = compute_minutes(
+        ordinals,
+        table.column("In Minutes").to_numpy(),
+        table.column("Out Minutes").to_numpy(),
+        holidays,
+        employees,
+    )
+    weekly_cap = WeeklyCap.for_rules()
+    if weekly_cap is not None:
+        apply_weekly_cap(result, weekly_cap)
+    return result
+
+
+def load_store(path, holidays=()):
+    """Load a file into an EntryStore, re-applying the rules for ``holidays``"""
+    return EntryStore.from_frame(load_frame(path, holidays))
@@ -0,0 +1,188 @@
+"""SQLite storage for punches and holidays.
+
+Only the raw punch (employee, date ordinal, in and out minutes) is stored;
+the rules are re-applied on load, which is cheap integer arithmetic, so a
+holiday change never leaves stale results on disk. Entries are unique per
+(employee, date, in, out) which makes re-importing a file idempotent, and
+that unique index also serves date-range queries for one employee; a
+second index on date serves queries across all employees. The position
+reached in each imported CSV file is kept too, so a growing file can be
+refreshed by reading only what was appended.
+"""
+import os
+import sqlite3
+from bisect import bisect_left
+from datetime import date
+
+from otcalc.aggregates import week_key
+from otcalc.importer import ImportState
+from otcalc.rules import WeeklyCap, crosses_midnight, get_rules, is_ot_day, shift_minutes, split_shift
+from otcalc.store import EntryStore, employee_code, employee_name
+
+DEFAULT_DB_PATH = os.environ.get(
+    "OT_TIMECARD_DB", os.path.join(os.path.expanduser("~"), ".ot_timecard.db")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    employee TEXT NOT NULL DEFAULT '',
+    date INTEGER NOT NULL,
+    in_minutes INTEGER NOT NULL,
+    out_minutes INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS entries_employee_date
+    ON entries (employee, date, in_minutes, out_minutes);
+CREATE INDEX IF NOT EXISTS entries_date ON entries (date);
+CREATE TABLE IF NOT EXISTS holidays (
+    date INTEGER PRIMARY KEY,
+    description TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    header_hash TEXT NOT NULL,
+    tail_hash TEXT NOT NULL,
+    pending_hash TEXT NOT NULL DEFAULT '',
+    imported_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+class TimecardDB:
+    """Embedded store for entries and holidays.
+
+    A connection belongs to the thread that opened it; background tasks
+    open their own TimecardDB on the same path.
+    """
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(imports)")]
+        if "pending_hash" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE imports ADD COLUMN pending_hash TEXT NOT NULL DEFAULT ''")
+    
+    def close(self):
+        self.conn.close()
+    
+    def add_entries(self, rows):
+        """Insert (employee, date ordinal, in minutes, out minutes) rows in one transaction"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO entries (employee, date, in_minutes, out_minutes) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+    
+    def add_store(self, store):
+        """Insert every row of an EntryStore"""
+        self.add_entries(
+            (employee_name(employee), ordinal, in_minutes, out_minutes)
+            for employee, ordinal, in_minutes, out_minutes
+            in zip(store.employee, store.date, store.in_minutes, store.out_minutes)
+        )
+    
+    def delete_entries(self, rows):
+        """Delete (employee, date ordinal, in minutes, out minutes) rows in one transaction"""
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM entries WHERE employee = ? AND date = ? AND in_minutes = ? AND out_minutes = ?",
+                rows,
+            )
+    
+    def query_range(self, employee, start, end):
+        """Return (employee, date, in, out) rows for start <= date ordinal < end.
+
+        ``employee=None`` returns every employee. Rows come in date order.
+        """
+        if employee is None:
+            return self.conn.execute(
+                "SELECT employee, date, in_minutes, out_minutes FROM entries "
+                "WHERE date >= ? AND date < ? ORDER BY date, employee, in_minutes",
+                (start, end),
+            ).fetchall()
+        return self.conn.execute(
+            "SELECT employee, date, in_minutes, out_minutes FROM entries "
+            "WHERE employee = ? AND date >= ? AND date < ? ORDER BY date, in_minutes",
+            (employee, start, end),
+        ).fetchall()
+    
+    def load_range(self, employee, start, end, holidays=()):
+        """Load a date range into an EntryStore, applying the rules.
+
+        With a weekly cap, the rows from the Monday before ``start`` are read
+        too, so a week cut by the range is capped as in a full import.
+        """
+        rules = get_rules()
+        weekly_cap = WeeklyCap.for_rules(rules)
+        first = week_key(start) if weekly_cap is not None else start
+        store = EntryStore()
+        ot_days = {}
+
+        def classify(ordinal):
+            ot_day = ot_days.get(ordinal)
+            if ot_day is None:
+                ot_day = ot_days[ordinal] = is_ot_day(date.fromordinal(ordinal), holidays)
+            return ot_day
+
+        for name, ordinal, in_minutes, out_minutes in self.query_range(employee, first, end):
+            ot_day = classify(ordinal)
+            if in_minutes < 0 or out_minutes < 0:
+                total = 0
+            else:
+                total = shift_minutes(in_minutes, out_minutes)
+            next_ot_day = classify(ordinal + 1) if crosses_midnight(in_minutes, total) else ot_day
+            regular, overtime, ot_day_minutes = split_shift(max(in_minutes, 0), total, ot_day, next_ot_day)
+            store.append(ordinal, in_minutes, out_minutes, total, regular, overtime, int(ot_day), employee_code(name),
+                         ot_day_minutes, rules.night_minutes(max(in_minutes, 0), total))
+        if weekly_cap is not None:
+            store.apply_weekly_cap()
+            earlier = bisect_left(store.date, start)
+            if earlier:
+                store.delete(range(earlier))
+        return store
+    
+    def load_month(self, employee, year, month, holidays=()):
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+        return self.load_range(employee, start.toordinal(), end.toordinal(), holidays)
+    
+    def save_holiday(self, day, description=""):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO holidays (date, description) VALUES (?, ?)",
+                (day.toordinal(), description),
+            )
+    
+    def delete_holiday(self, day):
+        with self.conn:
+            self.conn.execute("DELETE FROM holidays WHERE date = ?", (day.toordinal(),))
+    
+    def load_holidays(self):
+        """Return [(date, description)] for every saved holiday"""
+        rows = self.conn.execute("SELECT date, description FROM holidays ORDER BY date").fetchall()
+        return [(date.fromordinal(ordinal), description) for ordinal, description in rows]
+    
+    def save_import_state(self, state):
+        """Remember where an import of a CSV file stopped (an otcalc.importer.ImportState)"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO imports (path, offset, lines, header_hash, tail_hash, pending_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                tuple(state),
+            )
+    
+    def delete_import_state(self, path):
+        with self.conn:
+            self.conn.execute("DELETE FROM imports WHERE path = ?", (path,))
+    
+    def last_import_state(self):
+        """Return the ImportState of the most recently imported file, or None"""
+        row = self.conn.execute(
+            "SELECT path, offset, lines, header_hash, tail_hash, pending_hash FROM imports "
+            "ORDER BY imported_at DESC, rowid DESC"
+        ).fetchone()
+        return ImportState(*row) if row else None
@@ -0,0 +1,386 @@
+"""Vectorized overtime engine for bulk punch imports.
+
+Applies the same rules as ``otcalc.rules`` to a whole
+DataFrame of Date / In Time / Out Time columns in one pass. Punch data is
+drawn from a small vocabulary of strings, so every distinct value is parsed
+once (through the memoized parsers in ``otcalc.rules``) and the results are
+broadcast back over the rows. The rules in use are compiled once into
+numpy lookup tables, so configured rules cost the same as the defaults.
+"""
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from otcalc.instrument import count, stage
+from otcalc.rules import (
+    MINUTES_PER_DAY,
+    ONE_DAY,
+    get_rules,
+    is_ot_day,
+    parse_date,
+    parse_time,
+    row_error,
+)
+
+
+@lru_cache(maxsize=8)
+def rule_tables(rules):
+    """Return (regular, overtime, night, premium) numpy tables for a RuleSet.
+
+    ``regular`` and ``overtime`` are indexed by [ot_day, total minutes];
+    ``night`` is the running night-minute count, or None without a night
+    window; ``premium`` is indexed by night minutes, or None without a
+    night premium.
+    """
+    split = np.array(rules.split_table, dtype=np.int64)
+    night = None if rules.night_table is None else np.array(rules.night_table, dtype=np.int64)
+    premium = None if rules.premium_table is None else np.array(rules.premium_table, dtype=np.int64)
+    return split[..., 0], split[..., 1], night, premium
+
+
+@lru_cache(maxsize=8)
+def hhmm_labels(size):
+    """Return "HH:MM" labels for 0 to size - 1 minutes"""
+    return np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(size)], dtype=object)
+
+
+def format_minutes(minutes, rules=None):
+    """Return an object array of HH:MM strings for an array of minutes.
+
+    The labels cover every value the rules can produce for a row
+    (``RuleSet.max_minutes``).
+    """
+    return hhmm_labels((rules or get_rules()).max_minutes + 1)[np.asarray(minutes, dtype=np.int64)]
+
+
+def parse_times(values):
+    """Parse a column of HH:MM AM/PM strings into minutes after midnight.
+
+    Values that cannot be parsed come back as -1.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    # One extra slot at the end so the NaN code (-1) maps to "invalid"
+    parsed = np.full(len(uniques) + 1, -1, dtype=np.int64)
+    for i, value in enumerate(uniques):
+        try:
+            parsed[i] = parse_time(value)
+        except (TypeError, ValueError):
+            continue
+    return parsed[codes]
+
+
+def classify_dates(values, holidays=(), strict=True, next_day=False):
+    """Return (ordinal, is_ot_day) arrays for a column of YYYY-MM-DD strings.
+
+    Raises ValueError on a missing or malformed date, like
+    ``datetime.strptime`` does; with ``strict=False`` such dates get
+    ordinal -1 instead. With ``next_day``, an is_ot_day array for the
+    following day is returned as well.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    if strict and (codes < 0).any():
+        raise ValueError("missing date value")
+    # One extra slot at the end so the NaN code (-1) maps to "invalid"
+    ordinal = np.full(len(uniques) + 1, -1, dtype=np.int64)
+    ot_day = np.zeros(len(uniques) + 1, dtype=bool)
+    next_ot_day = np.zeros(len(uniques) + 1, dtype=bool)
+    for i, value in enumerate(uniques):
+        try:
+            date_obj = parse_date(value)
+        except (TypeError, ValueError):
+            if strict:
+                raise
+            continue
+        ordinal[i] = date_obj.toordinal()
+        ot_day[i] = is_ot_day(date_obj, holidays)
+        if next_day:
+            next_ot_day[i] = is_ot_day(date_obj + ONE_DAY, holidays)
+    if next_day:
+        return ordinal[codes], ot_day[codes], next_ot_day[codes]
+    return ordinal[codes], ot_day[codes]
+
+
+def validate_punches(df, in_minutes, out_minutes, ordinal):
+    """Return (ok, errors) for parsed punches.
+
+    ``ok`` is a boolean array of the rows that can be computed; ``errors``
+    lists a RowError for every other row, with the CSV line number taken
+    from the frame's index (the header is line 1). A row is reported once,
+    for the first bad column.
+    """
+    bad_date = ordinal < 0
+    bad_in = in_minutes < 0
+    bad_out = out_minutes < 0
+    ok = ~(bad_date | bad_in | bad_out)
+    if ok.all():
+        return ok, []
+
+    rows = np.flatnonzero(~ok)
+    column = np.select(
+        [bad_date[rows], bad_in[rows]], ["Date", "In Time"], default="Out Time"
+    )
+    values = np.select(
+        [bad_date[rows], bad_in[rows]],
+        [df["Date"].to_numpy()[rows], df["In Time"].to_numpy()[rows]],
+        default=df["Out Time"].to_numpy()[rows],
+    )
+    lines = np.asarray(df.index)[rows] + 2
+    errors = [row_error(int(line), str(name), value) for line, name, value in zip(lines, column, values)]
+    return ok, errors
+
+
+def employee_codes(values):
+    """Map a column of employee IDs to interned store codes (missing -> "")"""
+    from otcalc.store import employee_code
+
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    # The extra slot at the end catches missing values (code -1)
+    interned = np.array([employee_code(str(value)) for value in uniques] + [0], dtype=np.int32)
+    return interned[codes]
+
+
+def classify_ordinals(ordinals, holidays=(), next_day=False):
+    """Return an is_ot_day array for an array of date ordinals.
+
+    With ``next_day``, an is_ot_day array for the following day is
+    returned as well.
+    """
+    uniques, inverse = np.unique(np.asarray(ordinals, dtype=np.int64), return_inverse=True)
+    days = [date.fromordinal(int(o)) for o in uniques]
+    ot_day = np.array([is_ot_day(day, holidays) for day in days], dtype=bool)
+    if next_day:
+        next_ot_day = np.array([is_ot_day(day + ONE_DAY, holidays) for day in days], dtype=bool)
+        return ot_day[inverse], next_ot_day[inverse]
+    return ot_day[inverse]
+
+
+def apply_rules(in_minutes, out_minutes, ot_day, rules=None, next_ot_day=None):
+    """Return (total, regular, overtime, ot_day_minutes, valid) arrays for parsed punches.
+
+    ``in_minutes`` / ``out_minutes`` are minutes after midnight, -1 where
+    the time could not be parsed. Shifts that run past midnight are split
+    there, the part on the next day being classified by ``next_ot_day``
+    (which defaults to ``ot_day``); see ``otcalc.rules.split_shift``.
+    ``rules`` defaults to the RuleSet in use.
+    """
+    regular_table, overtime_table, _, _ = rule_tables(rules or get_rules())
+    in_minutes = np.asarray(in_minutes, dtype=np.int64)
+    out_minutes = np.asarray(out_minutes, dtype=np.int64)
+    ot_day = np.asarray(ot_day, dtype=bool)
+    valid = (in_minutes >= 0) & (out_minutes >= 0)
+
+    total = out_minutes - in_minutes
+    total[total < 0] += MINUTES_PER_DAY  # out time on the next day
+    total[~valid] = 0
+
+    # Minutes on the start day, then the weekend/holiday share of the shift
+    first_day = np.minimum(total, MINUTES_PER_DAY - np.maximum(in_minutes, 0))
+    if next_ot_day is None:
+        ot_day_minutes = np.where(ot_day, total, 0)
+    else:
+        ot_day_minutes = np.where(ot_day, first_day, 0) + np.where(next_ot_day, total - first_day, 0)
+    weekday_minutes = total - ot_day_minutes
+    regular = regular_table[0][weekday_minutes]
+    overtime = overtime_table[0][weekday_minutes] + overtime_table[1][ot_day_minutes]
+    return total, regular, overtime, ot_day_minutes, valid
+
+
+def night_minutes(in_minutes, total, rules=None):
+    """Return the minutes of each shift inside the night window (0 without one)"""
+    _, _, night_table, _ = rule_tables(rules or get_rules())
+    total = np.asarray(total, dtype=np.int64)
+    if night_table is None:
+        return np.zeros(len(total), dtype=np.int64)
+    start = np.maximum(np.asarray(in_minutes, dtype=np.int64), 0)
+    return night_table[start + total] - night_table[start]
+
+
+def apply_weekly_cap(result, weekly_cap):
+    """Move regular minutes beyond a weekly cap into overtime, in place.
+
+    ``weekly_cap`` is an otcalc.rules.WeeklyCap keyed by employee code; it
+    carries the minutes used so far between the chunks of a file.
+    """
+    employee = result["employee"].to_numpy().astype(np.int64)
+    ordinal = result["date_ordinal"].to_numpy()
+    regular = result["regular_minutes"].to_numpy()
+    # One integer key per (employee, week) so rows group with factorize
+    keys = employee * 10_000_000 + (ordinal - (ordinal - 1) % 7)
+    codes, uniques = pd.factorize(keys)
+    buckets = [(int(key) // 10_000_000, int(key) % 10_000_000) for key in uniques]
+    used = np.array([weekly_cap.used.get(bucket, 0) for bucket in buckets], dtype=np.int64)
+
+    seen = pd.Series(regular).groupby(codes).cumsum().to_numpy() + used[codes]
+    excess = np.clip(seen - weekly_cap.cap_minutes, 0, regular)
+    for bucket, minutes in zip(buckets, used + np.bincount(codes, weights=regular).astype(np.int64)):
+        weekly_cap.used[bucket] = int(minutes)
+
+    result["regular_minutes"] = regular - excess
+    result["ot_minutes"] = result["ot_minutes"].to_numpy() + excess
+    if "Overtime" in result:
+        result["Overtime"] = format_minutes(result["ot_minutes"])
+    return result
+
+
+def compute_minutes(ordinals, in_minutes, out_minutes, holidays=(), employees=None):
+    """Compute punches that are already in integer form.
+
+    Returns a frame with the same minute columns as compute_frame, for
+    sources such as Parquet files that store ordinals and minutes natively.
+    ``employees`` is an optional array of employee codes.
+    """
+    ot_day, next_ot_day = classify_ordinals(ordinals, holidays, next_day=True)
+    total, regular, overtime, ot_day_minutes, valid = apply_rules(in_minutes, out_minutes, ot_day,
+                                                                  next_ot_day=next_ot_day)
+    return pd.DataFrame({
+        "date_ordinal": np.asarray(ordinals, dtype=np.int64),
+        "in_minutes": np.asarray(in_minutes, dtype=np.int64),
+        "out_minutes": np.asarray(out_minutes, dtype=np.int64),
+        "total_minutes": total,
+        "regular_minutes": regular,
+        "ot_minutes": overtime,
+        "ot_day": ot_day,
+        "ot_day_minutes": ot_day_minutes,
+        "valid": valid,
+        "night_minutes": night_minutes(in_minutes, total),
+        "employee": np.zeros(len(ot_day), dtype=np.int32) if employees is None else employees,
+    })
+
+
+def compute_frame(df, holidays=(), errors=None):
+    """Compute work and overtime columns for a DataFrame of punches.
+
+    ``df`` needs Date, In Time and Out Time columns and may have an
+    Employee column. The returned frame keeps the Date / In Time / Out Time
+    columns and adds the formatted Work Hours / Overtime strings, the date
+    ordinal, the integer minute columns (-1 for an unparseable time), the
+    weekend/holiday flag of the start day, the minutes worked on weekends
+    and holidays, the night minutes and the employee code.
+
+    Without ``errors`` a bad date raises ValueError and a bad time gives a
+    zero row marked not valid. With an ``errors`` list, every bad row is
+    left out of the result and a RowError for it is appended to the list.
+    """
+    missing = [name for name in ("Date", "In Time", "Out Time") if name not in df]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    with stage("engine.parse_times"):
+        in_minutes = parse_times(df["In Time"])
+        out_minutes = parse_times(df["Out Time"])
+    with stage("engine.classify_dates"):
+        ordinal, ot_day, next_ot_day = classify_dates(df["Date"], holidays, strict=errors is None, next_day=True)
+    if errors is not None:
+        with stage("engine.validate"):
+            ok, row_errors = validate_punches(df, in_minutes, out_minutes, ordinal)
+        if row_errors:
+            errors.extend(row_errors)
+            count("rejected_rows", len(row_errors))
+            df = df[ok]
+            in_minutes, out_minutes, ordinal = in_minutes[ok], out_minutes[ok], ordinal[ok]
+            ot_day, next_ot_day = ot_day[ok], next_ot_day[ok]
+    with stage("engine.rules"):
+        total, regular, overtime, ot_day_minutes, valid = apply_rules(in_minutes, out_minutes, ot_day,
+                                                                      next_ot_day=next_ot_day)
+    with stage("engine.format"):
+        work_hours = format_minutes(total)
+        overtime_hours = format_minutes(overtime)
+    count("rows", len(df))
+    count("parse_errors", int(len(df) - valid.sum()))
+
+    return pd.DataFrame({
+        "Date": df["Date"].to_numpy(),
+        "In Time": df["In Time"].to_numpy(),
+        "Out Time": df["Out Time"].to_numpy(),
+        "Work Hours": work_hours,
+        "Overtime": overtime_hours,
+        "date_ordinal": ordinal,
+        "in_minutes": in_minutes,
+        "out_minutes": out_minutes,
+        "total_minutes": total,
+        "regular_minutes": regular,
+        "ot_minutes": overtime,
+        "ot_day": ot_day,
+        "ot_day_minutes": ot_day_minutes,
+        "valid": valid,
+        "night_minutes": night_minutes(in_minutes, total),
+        "employee": employee_codes(df["Employee"]) if "Employee" in df else np.zeros(len(df), dtype=np.int32),
+    }, index=df.index)
+
+
+def credited_columns(result):
+    """Return (total, regular, overtime) arrays of minutes credited to the totals.
+
+    Vectorized form of ``otcalc.rules.credited_minutes``.
+    """
+    _, overtime_table, _, premium_table = rule_tables(get_rules())
+    ot_day_minutes = result["ot_day_minutes"].to_numpy()
+    regular = result["regular_minutes"].to_numpy()
+    # Weekend and holiday minutes are credited unrounded
+    overtime = result["ot_minutes"].to_numpy() + ot_day_minutes - overtime_table[1][ot_day_minutes]
+    if premium_table is not None:
+        overtime = overtime + premium_table[result["night_minutes"].to_numpy()]
+    return regular + overtime, regular, overtime
+
+
+def summarize(result):
+    """Return the footer totals, in minutes, for a frame from compute_frame"""
+    total, regular, overtime = credited_columns(result)
+    return {
+        "total": int(total.sum()),
+        "regular": int(regular.sum()),
+        "overtime": int(overtime.sum()),
+        "night": int(result["night_minutes"].sum()),
+    }
+
+
+
+def _credited_frame(result):
+    total, regular, overtime = credited_columns(result)
+    return pd.DataFrame({
+        "employee": result["employee"].to_numpy(),
+        "date": result["date_ordinal"].to_numpy(),
+        "rows": 1,
+        "total": total,
+        "regular": regular,
+        "overtime": overtime,
+    })
+
+
+def summarize_by_employee(result):
+    """Group credited minutes by employee in one pass.
+
+    Returns a frame indexed by employee ID with rows, total, regular and
+    overtime columns.
+    """
+    from otcalc.store import employee_name
+
+    grouped = _credited_frame(result).drop(columns="date").groupby("employee").sum()
+    grouped.index = [employee_name(code) for code in grouped.index]
+    return grouped.sort_index()
+
+
+def summarize_days(result):
+    """Group credited minutes by employee and date in one pass.
+
+    Returns {(employee code, date ordinal): [rows, total, regular, overtime]},
+    as EmployeeAggregates.add_days takes them.
+    """
+    grouped = _credited_frame(result).groupby(["employee", "date"], sort=False).sum()
+    return {
+        (int(employee), int(ordinal)): minutes
+        for (employee, ordinal), minutes in zip(grouped.index, grouped.to_numpy().tolist())
+    }
+
+
+def store_frame(store):
+    """Return the columns of an otcalc.store.EntryStore that summarize_days reads, as a frame"""
+    return pd.DataFrame({
+        "employee": np.array(store.employee, dtype=np.int64),
+        "date_ordinal": np.array(store.date, dtype=np.int64),
+        "regular_minutes": np.array(store.regular, dtype=np.int64),
+        "ot_minutes": np.array(store.overtime, dtype=np.int64),
+        "ot_day_minutes": np.array(store.ot_day_minutes, dtype=np.int64),
+        "night_minutes": np.array(store.night_minutes, dtype=np.int64),
+    })
@@ -0,0 +1,77 @@
+"""Holiday calendar shared by the GUI and the batch tools."""
+from otcalc.rules import get_rules, parse_date
+
+WEEKDAY = "weekday"
+WEEKEND = "weekend"
+HOLIDAY = "holiday"
+
+
+class HolidayManager:
+    def __init__(self):
+        self.holidays = set()  # Store holidays as a set of datetime objects
+        self._day_kinds = {}   # Cached classify() results, keyed by date
+        self._listeners = []
+    
+    def add_listener(self, callback):
+        """Call ``callback(date)`` whenever a date becomes or stops being a holiday"""
+        self._listeners.append(callback)
+    
+    def add_holiday(self, date):
+        """Add a holiday date"""
+        if date not in self.holidays:
+            self.holidays.add(date)
+            self._changed(date)
+    
+    def remove_holiday(self, date):
+        """Remove a holiday date"""
+        if date in self.holidays:
+            self.holidays.discard(date)
+            self._changed(date)
+    
+    def _changed(self, date):
+        self._day_kinds.pop(date, None)
+        for callback in self._listeners:
+            callback(date)
+    
+    def is_holiday(self, date):
+        """Check if a date is a holiday"""
+        return date in self.holidays
+    
+    def __contains__(self, date):
+        return date in self.holidays
+    
+    def get_holidays(self):
+        """Return list of holidays"""
+        return sorted(list(self.holidays))
+    
+    def classify(self, date):
+        """Return WEEKDAY, WEEKEND or HOLIDAY for a date"""
+        kind = self._day_kinds.get(date)
+        if kind is None:
+            if date in self.holidays:
+                kind = HOLIDAY
+            elif get_rules().is_weekend(date):
+                kind = WEEKEND
+            else:
+                kind = WEEKDAY
+            self._day_kinds[date] = kind
+        return kind
+    
+    def is_ot_day(self, date):
+        """Check if every minute worked on a date counts as overtime"""
+        return self.classify(date) != WEEKDAY
+
+
+def load_holiday_file(path):
+    """Read holidays from a file with one YYYY-MM-DD date per line.
+
+    Anything after a comma is treated as a description and ignored, as are
+    blank lines and lines starting with #.
+    """
+    holidays = set()
+    with open(path) as f:
+        for line in f:
+            value = line.split(",", 1)[0].strip()
+            if value and not value.startswith("#"):
+                holidays.add(parse_date(value))
+    return holidays
@@ -0,0 +1,332 @@
+"""Streaming CSV import with bounded memory.
+
+Punch logs are read a chunk at a time and only running totals are kept, so
+a multi-gigabyte file never has to fit in memory. Two readers are provided:
+``iter_chunks`` uses pandas and the vectorized engine, ``iter_rows`` walks
+the file with ``csv.reader`` and the pure rules. ``AppendReader`` feeds
+``iter_chunks`` only the lines a growing file gained since the last import.
+"""
+import csv
+import hashlib
+import io
+import mmap
+import os
+from collections import namedtuple
+
+from otcalc.instrument import stage
+from otcalc.rules import (
+    ONE_DAY,
+    EntryResult,
+    WeeklyCap,
+    credited_minutes,
+    crosses_midnight,
+    get_rules,
+    is_ot_day,
+    parse_date,
+    parse_time,
+    row_error,
+    shift_minutes,
+    split_shift,
+)
+
+DEFAULT_CHUNKSIZE = 50_000
+ERROR_REPORT_HEADER = ["Line", "Column", "Value", "Reason"]
+TAIL_CHECK_BYTES = 64 * 1024  # bytes before the last offset hashed to detect a rewritten file
+
+# Where an import of a CSV file stopped: the byte offset just past the last
+# complete line read, the number of lines up to there (header included),
+# hashes of the header and of the bytes just before the offset, and a hash
+# of the unterminated last line if that was read too ("" if not)
+ImportState = namedtuple("ImportState", ["path", "offset", "lines", "header_hash", "tail_hash", "pending_hash"],
+                         defaults=("",))
+
+
+class RunningTotals:
+    """Integer-minute totals accumulated while a file is streamed"""
+    def __init__(self):
+        self.rows = 0
+        self.invalid_rows = 0
+        self.total = 0
+        self.regular = 0
+        self.overtime = 0
+        self.night = 0
+        self.errors = []  # RowError for every rejected row
+
+    def add_frame(self, result):
+        """Fold in a frame returned by otcalc.engine.compute_frame"""
+        from otcalc.engine import summarize
+
+        summary = summarize(result)
+        self.rows += len(result)
+        self.invalid_rows += int((~result["valid"]).sum())
+        self.total += summary["total"]
+        self.regular += summary["regular"]
+        self.overtime += summary["overtime"]
+        self.night += summary["night"]
+
+    def add_result(self, result, valid=True):
+        """Fold in a single EntryResult"""
+        total, regular, overtime = credited_minutes(result)
+        self.rows += 1
+        if not valid:
+            self.invalid_rows += 1
+        self.total += total
+        self.regular += regular
+        self.overtime += overtime
+        self.night += result.night_minutes
+
+    def add_errors(self, errors):
+        """Count rejected rows (otcalc.rules.RowError) and keep them for the error report"""
+        self.rows += len(errors)
+        self.invalid_rows += len(errors)
+        self.errors.extend(errors)
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "invalid_rows": self.invalid_rows,
+            "total": self.total,
+            "regular": self.regular,
+            "overtime": self.overtime,
+            "night": self.night,
+        }
+
+
+def iter_chunks(path, holidays=(), chunksize=DEFAULT_CHUNKSIZE, errors=None, names=None, first_line=2):
+    """Yield computed frames for a CSV path or open file, one chunk at a time.
+
+    A weekly cap, if the rules have one, carries over from chunk to chunk.
+    With an ``errors`` list, bad rows are left out and reported there (see
+    otcalc.engine.compute_frame); blank lines are then read, so that line
+    numbers stay right, and dropped. ``names`` reads a file that
+    has no header line, whose first row is on line ``first_line``.
+    """
+    import pandas as pd
+    from otcalc.engine import apply_weekly_cap, compute_frame
+
+    weekly_cap = WeeklyCap.for_rules()
+    header = "infer" if names is None else None
+    with pd.read_csv(path, chunksize=chunksize, dtype={"Employee": str}, header=header, names=names,
+                     skip_blank_lines=errors is None) as reader:
+        while True:
+            with stage("import.read"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            if first_line != 2:
+                chunk.index += first_line - 2
+            if errors is not None:
+                chunk = chunk.dropna(how="all")  # blank lines; the index keeps the line numbers
+            result = compute_frame(chunk, holidays, errors)
+            if weekly_cap is not None:
+                apply_weekly_cap(result, weekly_cap)
+            yield result
+
+
+def iter_rows(path, holidays=(), errors=None):
+    """Yield (EntryResult, valid) for each row of a CSV file using csv.reader.
+
+    Rows with an unparseable time are yielded with zero minutes and
+    ``valid=False``; a malformed date raises ValueError, as in the chunked
+    reader. With an ``errors`` list, bad rows are skipped and reported there
+    instead.
+    """
+    rules = get_rules()
+    weekly_cap = WeeklyCap.for_rules(rules)
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        date_col = header.index("Date")
+        in_col = header.index("In Time")
+        out_col = header.index("Out Time")
+        employee_col = header.index("Employee") if "Employee" in header else None
+        for row in reader:
+            if not row:
+                continue  # a blank line, which pandas skips too
+            if errors is not None:
+                error = _check_row(reader.line_num, row, date_col, in_col, out_col)
+                if error is not None:
+                    errors.append(error)
+                    continue
+            # A short row reads as empty fields, as the missing columns do in pandas
+            date, in_time, out_time = _field(row, date_col), _field(row, in_col), _field(row, out_col)
+            day = parse_date(date)
+            ot_day = is_ot_day(day, holidays)
+            try:
+                in_minutes = parse_time(in_time)
+                total_minutes = shift_minutes(in_minutes, parse_time(out_time))
+            except ValueError:
+                yield EntryResult(date, in_time, out_time, 0, 0, 0, ot_day), False
+                continue
+            next_ot_day = is_ot_day(day + ONE_DAY, holidays) if crosses_midnight(in_minutes, total_minutes) else ot_day
+            regular_minutes, ot_minutes, ot_day_minutes = split_shift(in_minutes, total_minutes, ot_day, next_ot_day)
+            if weekly_cap is not None:
+                employee = _field(row, employee_col) if employee_col is not None else ""
+                regular_minutes, ot_minutes = weekly_cap.apply(employee, day.toordinal(), regular_minutes, ot_minutes)
+            yield EntryResult(date, in_time, out_time, total_minutes, regular_minutes, ot_minutes, ot_day,
+                              rules.night_minutes(in_minutes, total_minutes), ot_day_minutes), True
+
+
+class _MappedRange(io.RawIOBase):
+    """A read-only file over bytes [start, end) of an mmap, without copying them"""
+    def __init__(self, mapped, start, end):
+        self.mapped = mapped
+        self.start = start
+        self.end = end
+        self.position = start
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        size = min(len(buffer), self.end - self.position)
+        buffer[:size] = self.mapped[self.position:self.position + size]
+        self.position += size
+        return size
+    
+    def tell(self):
+        return self.position - self.start
+
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+class AppendReader:
+    """Reads only the complete lines a CSV file gained since an ImportState.
+
+    The file is memory-mapped. If the header or the bytes just before the
+    saved offset changed, or the file shrank, it was rewritten rather than
+    appended to and is read from the start; ``appended`` tells which. When
+    reading appended lines, a trailing line without a newline may still be
+    being written and is left for the next read. A read from the start
+    takes the whole file, but its state still ends before an unterminated
+    last line: the next read skips that line if it is unchanged (now
+    terminated or not) and reads it again if more was written to it.
+    """
+    def __init__(self, path, state=None):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self.mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.header_end = self.mapped.find(b"\n") + 1
+        self.end = self.mapped.rfind(b"\n") + 1
+        header = self.mapped[:self.header_end].decode("utf-8-sig").strip()
+        self.columns = next(csv.reader([header])) if header else []
+        self.header_hash = _digest(self.mapped[:self.header_end])
+        self.appended = state is not None and self._continues(state)
+        # Where the next read is to start, and the hash of a line read past it
+        self.offset, self.pending_hash = self.end, ""
+        if self.appended:
+            self.start, self.lines = state.offset, state.lines
+            if state.pending_hash:
+                self._skip_pending(state)
+        else:
+            self.start, self.lines = self.header_end, 1
+            if len(self.mapped) > max(self.end, self.header_end):
+                self.pending_hash = _digest(self.mapped[self.end:])
+            self.end = len(self.mapped)
+        self._stream = None
+    
+    def _continues(self, state):
+        return (
+            state.offset <= self.end
+            and state.header_hash == self.header_hash
+            and state.tail_hash == self._tail_hash(state.offset)
+        )
+    
+    def _skip_pending(self, state):
+        """Skip the unterminated line an earlier read took, unless it changed since"""
+        line_end = self.mapped.find(b"\n", self.start)
+        line = self.mapped[self.start:line_end if line_end >= 0 else len(self.mapped)]
+        if _digest(line) != state.pending_hash:
+            return
+        if line_end < 0:
+            # Still unterminated: nothing new, and the state stays as it was
+            self.end, self.offset, self.pending_hash = self.start, self.start, state.pending_hash
+        else:
+            self.start, self.lines = line_end + 1, self.lines + 1
+    
+    def _tail_hash(self, offset):
+        return _digest(self.mapped[max(self.header_end, offset - TAIL_CHECK_BYTES):offset])
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        self._stream = None
+        if isinstance(self.mapped, mmap.mmap):
+            self.mapped.close()
+        self._file.close()
+    
+    @property
+    def new_bytes(self):
+        return max(0, self.end - self.start)
+    
+    def iter_chunks(self, holidays=(), chunksize=DEFAULT_CHUNKSIZE, errors=None):
+        """Yield computed frames for the new lines (see iter_chunks)"""
+        if not self.new_bytes or not self.columns:
+            return
+        self._stream = io.BufferedReader(_MappedRange(self.mapped, self.start, self.end))
+        yield from iter_chunks(self._stream, holidays, chunksize, errors, self.columns, self.lines + 1)
+    
+    def fraction(self):
+        """Share of the new bytes read so far"""
+        if self._stream is None or not self.new_bytes:
+            return 1.0
+        return self._stream.raw.tell() / self.new_bytes
+    
+    def state(self):
+        """Return the ImportState for a later read, once every new line has been read"""
+        lines = self.lines
+        for block in range(self.start, self.offset, 1 << 20):
+            lines += self.mapped[block:min(block + (1 << 20), self.offset)].count(b"\n")
+        return ImportState(self.path, self.offset, lines, self.header_hash, self._tail_hash(self.offset),
+                           self.pending_hash)
+
+
+def _field(row, col):
+    return row[col] if col < len(row) else ""
+
+
+def _check_row(line, row, date_col, in_col, out_col):
+    """Return a RowError for the first bad column of a csv.reader row, or None"""
+    for column, col, parse in (("Date", date_col, parse_date), ("In Time", in_col, parse_time),
+                               ("Out Time", out_col, parse_time)):
+        value = _field(row, col)
+        try:
+            parse(value)
+        except ValueError:
+            return row_error(line, column, value)
+    return None
+
+
+def stream_totals(path, holidays=(), chunksize=DEFAULT_CHUNKSIZE, use_pandas=True, collect_errors=False):
+    """Return RunningTotals for a CSV file without loading it all at once.
+
+    With ``collect_errors``, bad rows are skipped and kept in the totals'
+    ``errors`` instead of stopping the stream at the first bad date.
+    """
+    totals = RunningTotals()
+    errors = [] if collect_errors else None
+    if use_pandas:
+        for result in iter_chunks(path, holidays, chunksize, errors):
+            totals.add_frame(result)
+    else:
+        for result, valid in iter_rows(path, holidays, errors):
+            totals.add_result(result, valid)
+    if errors:
+        totals.add_errors(errors)
+    return totals
+
+
+def write_error_report(path, errors):
+    """Write rejected rows (otcalc.rules.RowError) to a CSV file"""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(ERROR_REPORT_HEADER)
+        writer.writerows(errors)
@@ -0,0 +1,253 @@
+"""Opt-in timers, counters and profiling for the hot paths.
+
+Instrumentation is off unless ``enable()`` is called or the OT_INSTRUMENT
+environment variable is set. While it is off, ``stage()`` hands back a
+shared no-op context manager and ``count()`` returns at once, so the
+probes left in the code cost one flag check each.
+
+    with stage("import.read"):
+        chunk = next(reader, None)
+    count("rows", len(chunk))
+
+Stages are named "<path>.<step>"; ``snapshot()`` returns everything
+gathered so far, together with the hit rates of the parse caches.
+cProfile and pstats are imported only once a profile is asked for.
+"""
+import functools
+import io
+import json
+import os
+import threading
+import time
+
+_enabled = bool(os.environ.get("OT_INSTRUMENT"))
+_lock = threading.Lock()
+_stages = {}       # name -> [calls, total seconds, max seconds]
+_counters = {}     # name -> count
+_profiling = False
+_profiles = []     # finished cProfile.Profile objects
+_main_profile = None
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        with _lock:
+            record = _stages.get(self.name)
+            if record is None:
+                _stages[self.name] = [1, elapsed, elapsed]
+            else:
+                record[0] += 1
+                record[1] += elapsed
+                if elapsed > record[2]:
+                    record[2] = elapsed
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Forget every timer, counter and captured profile"""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _profiles.clear()
+
+
+def stage(name):
+    """Return a context manager that times a stage while instrumentation is on"""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def count(name, amount=1):
+    """Add to a counter while instrumentation is on"""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def timed(name):
+    """Decorator form of stage() for a whole function or method"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_profile():
+    """Start capturing a cProfile of the calling thread and of later worker threads"""
+    global _profiling, _main_profile
+    if _profiling:
+        return
+    import cProfile
+
+    _profiling = True
+    _main_profile = cProfile.Profile()
+    _main_profile.enable()
+
+
+def stop_profile():
+    """Stop capturing; the profile is kept until reset()"""
+    global _profiling, _main_profile
+    if not _profiling:
+        return
+    _profiling = False
+    _main_profile.disable()
+    with _lock:
+        _profiles.append(_main_profile)
+    _main_profile = None
+
+
+def profiling():
+    return _profiling
+
+
+def profile_thread(func, *args):
+    """Run ``func(*args)``, profiling it if a capture is in progress.
+
+    cProfile only sees the thread it was enabled on, so background workers
+    call through this to be included.
+    """
+    if not _profiling:
+        return func(*args)
+    import cProfile
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return func(*args)
+    finally:
+        profile.disable()
+        with _lock:
+            _profiles.append(profile)
+
+
+def profile_stats():
+    """Return a pstats.Stats over every finished capture, or None"""
+    with _lock:
+        profiles = list(_profiles)
+    if not profiles:
+        return None
+    import pstats
+
+    stats = pstats.Stats(profiles[0])
+    for profile in profiles[1:]:
+        stats.add(profile)
+    return stats
+
+
+def save_profile(path):
+    """Write the captured profile in pstats format; return False if there is none"""
+    stats = profile_stats()
+    if stats is None:
+        return False
+    stats.dump_stats(path)
+    return True
+
+
+def profile_summary(limit=25):
+    """Return the top functions by cumulative time as text"""
+    stats = profile_stats()
+    if stats is None:
+        return ""
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+def cache_stats():
+    """Hit rates of the memoized parsers in otcalc.rules"""
+    from otcalc.rules import parse_date, parse_time
+
+    caches = {}
+    for name, func in (("parse_time", parse_time), ("parse_date", parse_date)):
+        info = func.cache_info()
+        lookups = info.hits + info.misses
+        caches[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
+    return caches
+
+
+def snapshot():
+    """Return the timers, counters and cache statistics as plain data"""
+    with _lock:
+        stages = {
+            name: {"calls": calls, "seconds": seconds, "max_seconds": longest}
+            for name, (calls, seconds, longest) in sorted(_stages.items())
+        }
+        counters = dict(sorted(_counters.items()))
+    return {"enabled": _enabled, "stages": stages, "counters": counters, "caches": cache_stats()}
+
+
+def format_snapshot(data=None):
+    """Return a snapshot as a text table"""
+    data = snapshot() if data is None else data
+    lines = [f"{'Stage':<28}{'Calls':>9}{'Total ms':>12}{'Avg ms':>10}{'Max ms':>10}"]
+    for name, record in data["stages"].items():
+        calls = record["calls"]
+        lines.append(f"{name:<28}{calls:>9}{record['seconds'] * 1000:>12.1f}"
+                     f"{record['seconds'] * 1000 / calls:>10.3f}{record['max_seconds'] * 1000:>10.3f}")
+    lines.append("")
+    lines.append(f"{'Counter':<28}{'Value':>9}")
+    for name, value in data["counters"].items():
+        lines.append(f"{name:<28}{value:>9}")
+    lines.append("")
+    lines.append(f"{'Cache':<28}{'Hits':>9}{'Misses':>12}{'Hit rate':>10}")
+    for name, info in data["caches"].items():
+        lines.append(f"{name:<28}{info['hits']:>9}{info['misses']:>12}{info['hit_rate']:>10.1%}")
+    return "\n".join(lines)
+
+
+def dump(path):
+    """Write the snapshot, and the profile summary if one was captured, as JSON"""
+    data = snapshot()
+    summary = profile_summary()
+    if summary:
+        data["profile"] = summary
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
@@ -0,0 +1,113 @@
+"""Paged, fixed-width time card report generated as a stream.
+
+Rows are formatted one at a time and grouped into pages, with week and
+month subtotals emitted as the dates roll over, so the report never
+exists as one big string: the preview renders the first pages and the
+save path writes page by page.
+"""
+from datetime import date, datetime
+
+from otcalc.aggregates import week_key
+from otcalc.rules import format_hhmm
+
+PAGE_LINES = 60
+WIDTH = 80
+HEADERS = ("Employee", "Date", "Time In", "Time Out", "Work Hours", "Overtime")
+ROW_FORMAT = "{:<12}{:<12}{:<11}{:<11}{:>17}{:>17}"
+SUBTOTAL_FORMAT = "  {:<44}{:>17}{:>17}"
+
+
+def iter_body_lines(entries):
+    """Yield one line per entry in date order, plus week and month subtotals.
+
+    Subtotals are the credited minutes, so they add up to the summary.
+    """
+    week = month = None
+    week_totals = [0, 0]
+    month_totals = [0, 0]
+    last_ordinal = None
+    for index in entries.date_order():
+        ordinal = entries.date[index]
+        if ordinal != last_ordinal:
+            last_ordinal = ordinal
+            day = date.fromordinal(ordinal)
+            if week is not None and week_key(ordinal) != week:
+                yield from _subtotal(f"Week of {date.fromordinal(week).isoformat()}", week_totals)
+            if month is not None and (day.year, day.month) != month:
+                yield from _subtotal(f"Month {month[0]}-{month[1]:02d}", month_totals)
+            week = week_key(ordinal)
+            month = (day.year, day.month)
+        yield ROW_FORMAT.format(*entries.display_row(index))
+        total, _, overtime = entries.credited(index)
+        week_totals[0] += total
+        week_totals[1] += overtime
+        month_totals[0] += total
+        month_totals[1] += overtime
+    if week is not None:
+        yield from _subtotal(f"Week of {date.fromordinal(week).isoformat()}", week_totals)
+        yield from _subtotal(f"Month {month[0]}-{month[1]:02d}", month_totals)
+
+
+def _subtotal(label, totals):
+    yield SUBTOTAL_FORMAT.format(label, format_hhmm(totals[0]), format_hhmm(totals[1]))
+    yield ""
+    totals[0] = totals[1] = 0
+
+
+def iter_report(entries, total_minutes, overtime_minutes, page_lines=PAGE_LINES, generated=None,
+                employee_totals=()):
+    """Yield the report one page at a time; each page is a string.
+
+    ``employee_totals`` is an optional list of (employee, total minutes,
+    overtime minutes) shown in the summary when there is more than one.
+    """
+    generated = generated or datetime.now()
+    header = [
+        "Time Card Report",
+        "=" * WIDTH,
+        f"Generated on: {generated.strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+        ROW_FORMAT.format(*HEADERS),
+        "-" * WIDTH,
+    ]
+    body_lines = page_lines - len(header) - 1
+
+    def lines():
+        if len(entries):
+            yield from iter_body_lines(entries)
+        else:
+            yield "No records found."
+        yield ""
+        yield "Summary:"
+        yield "=" * WIDTH
+        yield f"Total Work Hours: {total_minutes / 60:.2f} hours"
+        yield f"Total Overtime Hours: {overtime_minutes / 60:.2f} hours"
+        if len(employee_totals) > 1:
+            yield ""
+            yield "By employee:"
+            for employee, total, overtime in employee_totals:
+                yield SUBTOTAL_FORMAT.format(employee or "(none)", format_hhmm(total), format_hhmm(overtime))
+
+    page = []
+    number = 1
+    for line in lines():
+        page.append(line)
+        if len(page) == body_lines:
+            yield _page(header, page, number)
+            page = []
+            number += 1
+    if page:
+        yield _page(header, page, number)
+
+
+def _page(header, body, number):
+    return "\n".join(header + body + [f"{'Page ' + str(number):>{WIDTH}}"]) + "\n"
+
+
+def write_report(path, pages):
+    """Write pages to a text file, separated by form feeds"""
+    with open(path, "w") as f:
+        for number, page in enumerate(pages):
+            if number:
+                f.write("\f")
+            f.write(page)
@@ -0,0 +1,409 @@
+"""Overtime rules, free of any GUI or dataframe dependency.
+
+This is the reference implementation of the rules used by the Time
+Calculator: it is what ``TimeCardApp.add_entry`` calls, and what batch
+workers import on machines without a display.
+
+The built-in constants below are the defaults of a RuleSet; sites with
+other thresholds load their own from a TOML or JSON file (``load_rules``)
+and install it with ``set_rules``.
+"""
+import json
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+TIME_FORMAT = "%I:%M %p"
+DATE_FORMAT = "%Y-%m-%d"
+
+REGULAR_CAP_MINUTES = 465     # 7h45m regular day
+OT_THRESHOLD_MINUTES = 60     # overtime only counts once the 9th hour is completed
+OT_STEP_MINUTES = 15          # overtime is rounded down to 15 minutes
+MINUTES_PER_DAY = 24 * 60
+ONE_DAY = timedelta(days=1)
+
+ROUNDING_MODES = ("down", "nearest", "up")
+RULE_OPTIONS = (
+    "regular_cap_minutes", "ot_threshold_minutes", "ot_step_minutes", "rounding",
+    "weekend_days", "night_start", "night_end", "night_premium_percent", "weekly_regular_cap_minutes",
+)
+DAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+DEFAULT_RULES_PATH = os.environ.get(
+    "OT_RULES", os.path.join(os.path.expanduser("~"), ".ot_rules.toml")
+)
+
+# Punch times come from a tiny vocabulary (the time entry widget offers 96
+# values), so parsed strings are memoized; these bound the caches.
+TIME_CACHE_SIZE = 1024
+DATE_CACHE_SIZE = 4096
+
+EntryResult = namedtuple(
+    "EntryResult",
+    ["date", "in_time", "out_time", "total_minutes", "regular_minutes", "ot_minutes", "ot_day", "night_minutes",
+     "ot_day_minutes"],
+    defaults=(0, 0),
+)
+EntryError = namedtuple("EntryError", ["index", "entry", "message"])
+RowError = namedtuple("RowError", ["line", "column", "value", "reason"])  # a rejected row of an input file
+
+
+def format_hhmm(minutes):
+    """Return minutes as an HH:MM string"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def format_time(minutes):
+    """Return minutes after midnight as an HH:MM AM/PM string"""
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour - 1) % 12 + 1:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def parse_time(value):
+    """Parse an HH:MM AM/PM string into minutes after midnight"""
+    t = datetime.strptime(value, TIME_FORMAT)
+    return t.hour * 60 + t.minute
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(value):
+    """Parse a YYYY-MM-DD string into a date"""
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+
+def round_minutes(minutes, step, mode):
+    """Round minutes to a multiple of step; mode is down, nearest (half up) or up"""
+    if mode == "down":
+        return (minutes // step) * step
+    if mode == "up":
+        return -(-minutes // step) * step
+    return ((minutes + step // 2) // step) * step
+
+
+class RuleSet:
+    """A site's overtime rules, validated and compiled once.
+
+    Every shift is shorter than a day, so the regular/overtime split is
+    precomputed for each possible length and the night window is kept as a
+    running count of night minutes; evaluating a punch is then a couple of
+    table lookups whatever the options are. A night premium credits that
+    percentage of a shift's night minutes, rounded down, as extra overtime.
+    """
+    def __init__(self, regular_cap_minutes=REGULAR_CAP_MINUTES, ot_threshold_minutes=OT_THRESHOLD_MINUTES,
+                 ot_step_minutes=OT_STEP_MINUTES, rounding="down", weekend_days=("saturday", "sunday"),
+                 night_start=None, night_end=None, night_premium_percent=0, weekly_regular_cap_minutes=None):
+        self.regular_cap_minutes = _minutes_option("regular_cap_minutes", regular_cap_minutes, 0, MINUTES_PER_DAY)
+        self.ot_threshold_minutes = _minutes_option("ot_threshold_minutes", ot_threshold_minutes, 0, MINUTES_PER_DAY)
+        self.ot_step_minutes = _minutes_option("ot_step_minutes", ot_step_minutes, 1, MINUTES_PER_DAY)
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f"rounding must be one of {', '.join(ROUNDING_MODES)}, not {rounding!r}")
+        self.rounding = rounding
+        self.weekend_days = frozenset(_weekday_option(day) for day in weekend_days)
+        if (night_start is None) != (night_end is None):
+            raise ValueError("night_start and night_end must be given together")
+        self.night_start = None if night_start is None else _time_option("night_start", night_start)
+        self.night_end = None if night_end is None else _time_option("night_end", night_end)
+        if isinstance(night_premium_percent, bool) or not isinstance(night_premium_percent, int) \
+                or not 0 <= night_premium_percent <= 1000:
+            raise ValueError(f"night_premium_percent must be a whole number from 0 to 1000, not {night_premium_percent!r}")
+        if night_premium_percent and night_start is None:
+            raise ValueError("night_premium_percent needs night_start and night_end")
+        self.night_premium_percent = night_premium_percent
+        if weekly_regular_cap_minutes is not None:
+            weekly_regular_cap_minutes = _minutes_option(
+                "weekly_regular_cap_minutes", weekly_regular_cap_minutes, 0, 7 * MINUTES_PER_DAY)
+        self.weekly_regular_cap_minutes = weekly_regular_cap_minutes
+        self.options = {
+            "regular_cap_minutes": self.regular_cap_minutes,
+            "ot_threshold_minutes": self.ot_threshold_minutes,
+            "ot_step_minutes": self.ot_step_minutes,
+            "rounding": rounding,
+            "weekend_days": sorted(self.weekend_days),
+            "night_start": night_start,
+            "night_end": night_end,
+            "night_premium_percent": night_premium_percent,
+            "weekly_regular_cap_minutes": weekly_regular_cap_minutes,
+        }
+        self._compile()
+    
+    def _compile(self):
+        # (regular, overtime) for every shift length, on weekdays and on OT days
+        weekday = []
+        ot_day = []
+        for total in range(MINUTES_PER_DAY + 1):
+            regular = min(self.regular_cap_minutes, total)
+            raw_ot = total - regular
+            if raw_ot < self.ot_threshold_minutes:
+                weekday.append((regular, 0))
+            else:
+                weekday.append((regular, round_minutes(raw_ot, self.ot_step_minutes, self.rounding)))
+            ot_day.append((0, round_minutes(total, self.ot_step_minutes, self.rounding)))
+        self.split_table = (tuple(weekday), tuple(ot_day))
+        # Most minutes a row can show: rounding up can pass a day, a shift
+        # split at midnight rounds both parts, and a weekly cap moves regular
+        # minutes into overtime
+        self.max_minutes = max(MINUTES_PER_DAY, max(r + o for r, o in weekday) + max(o for _, o in ot_day))
+        
+        # night_table[m] counts the night minutes in [0, m) over two days, so
+        # a shift starting at s and lasting t minutes has
+        # night_table[s + t] - night_table[s] night minutes
+        self.night_table = None
+        if self.night_start is not None and self.night_start != self.night_end:
+            start, end = self.night_start, self.night_end
+            counts = [0]
+            for minute in range(2 * MINUTES_PER_DAY):
+                m = minute % MINUTES_PER_DAY
+                is_night = start <= m < end if start < end else (m >= start or m < end)
+                counts.append(counts[-1] + is_night)
+            self.night_table = tuple(counts)
+        
+        # Extra overtime credited for a shift's night minutes
+        self.premium_table = None
+        if self.night_table is not None and self.night_premium_percent:
+            self.premium_table = tuple(m * self.night_premium_percent // 100 for m in range(MINUTES_PER_DAY + 1))
+    
+    def __reduce__(self):
+        # Pickle the options rather than the tables, for process pools
+        return rules_from_dict, (self.options,)
+    
+    def __eq__(self, other):
+        return isinstance(other, RuleSet) and self.options == other.options
+    
+    def __hash__(self):
+        return hash(json.dumps(self.options, sort_keys=True))
+    
+    def is_weekend(self, date):
+        return date.weekday() in self.weekend_days
+    
+    def split(self, total_minutes, ot_day):
+        """Split worked minutes into (regular, overtime) minutes"""
+        return self.split_table[1 if ot_day else 0][total_minutes]
+    
+    def night_minutes(self, in_minutes, total_minutes):
+        """Minutes of a shift that fall inside the night window"""
+        if self.night_table is None:
+            return 0
+        return self.night_table[in_minutes + total_minutes] - self.night_table[in_minutes]
+
+
+def _minutes_option(name, value, low, high):
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise ValueError(f"{name} must be a whole number of minutes from {low} to {high}, not {value!r}")
+    return value
+
+
+def _weekday_option(day):
+    if isinstance(day, str) and day.lower() in DAY_NAMES:
+        return DAY_NAMES.index(day.lower())
+    if isinstance(day, int) and not isinstance(day, bool) and 0 <= day <= 6:
+        return day
+    raise ValueError(f"weekend_days must hold day names or 0-6 (Monday is 0), not {day!r}")
+
+
+def _time_option(name, value):
+    try:
+        return parse_time(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a time like '10:00 PM', not {value!r}") from None
+
+
+def rules_from_dict(options):
+    """Build a RuleSet from a mapping of option names, rejecting unknown ones"""
+    unknown = sorted(set(options) - set(RULE_OPTIONS))
+    if unknown:
+        raise ValueError(f"unknown rule option(s): {', '.join(unknown)}")
+    return RuleSet(**options)
+
+
+def load_rules(path):
+    """Read and validate a RuleSet from a .toml or .json file.
+
+    Raises ValueError for a malformed file or an invalid option.
+    """
+    if path.lower().endswith(".toml"):
+        import tomllib
+
+        with open(path, "rb") as f:
+            try:
+                options = tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f"{path}: {e}") from None
+    else:
+        with open(path) as f:
+            try:
+                options = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: {e}") from None
+    if not isinstance(options, dict):
+        raise ValueError(f"{path}: expected a table of rule options")
+    return rules_from_dict(options)
+
+
+DEFAULT_RULES = RuleSet()
+_active_rules = DEFAULT_RULES
+
+
+def set_rules(rules):
+    """Install the RuleSet used by every calculation in this process.
+
+    Meant to be called once at startup, before holidays are classified.
+    """
+    global _active_rules
+    _active_rules = DEFAULT_RULES if rules is None else rules
+
+
+def get_rules():
+    """Return the RuleSet in use"""
+    return _active_rules
+
+
+class WeeklyCap:
+    """Moves regular minutes beyond the weekly cap into overtime.
+
+    Punches are fed in date and time order; the regular minutes already
+    seen are kept per (employee, week), so a file can be fed a chunk at a
+    time. Stored rows are re-capped a week at a time with
+    ``EntryStore.apply_weekly_cap``.
+    """
+    def __init__(self, cap_minutes):
+        self.cap_minutes = cap_minutes
+        self.used = {}  # (employee, Monday ordinal) -> regular minutes so far
+    
+    @classmethod
+    def for_rules(cls, rules=None):
+        """Return a WeeklyCap for the rules in use, or None if they have no weekly cap"""
+        cap = (rules or get_rules()).weekly_regular_cap_minutes
+        return None if cap is None else cls(cap)
+    
+    def apply(self, employee, ordinal, regular_minutes, ot_minutes):
+        """Return the (regular, overtime) minutes of a punch after the cap"""
+        key = (employee, ordinal - (ordinal - 1) % 7)
+        used = self.used.get(key, 0)
+        self.used[key] = used + regular_minutes
+        excess = min(regular_minutes, max(0, used + regular_minutes - self.cap_minutes))
+        return regular_minutes - excess, ot_minutes + excess
+    
+    def apply_result(self, result, employee=""):
+        """Return an EntryResult with the cap applied"""
+        regular, overtime = self.apply(employee, parse_date(result.date).toordinal(),
+                                       result.regular_minutes, result.ot_minutes)
+        return result._replace(regular_minutes=regular, ot_minutes=overtime)
+
+
+def row_error(line, column, value):
+    """Return the RowError for a missing or unparseable value in a column"""
+    if value is None or value != value or value == "":  # value != value catches NaN
+        return RowError(line, column, "", f"missing {column.lower()}")
+    return RowError(line, column, str(value), f"invalid {column.lower()}")
+
+
+def is_ot_day(date, holidays=()):
+    """Check if every minute worked on a date counts as overtime.
+
+    ``holidays`` is a collection of dates, or a HolidayManager, whose
+    cached classification is used instead.
+    """
+    classify = getattr(holidays, "is_ot_day", None)
+    if classify is not None:
+        return classify(date)
+    return date.weekday() in _active_rules.weekend_days or date in holidays
+
+
+def split_minutes(total_minutes, ot_day):
+    """Split worked minutes into (regular, overtime) minutes under the rules in use"""
+    return _active_rules.split_table[1 if ot_day else 0][total_minutes]
+
+
+def split_shift(in_minutes, total_minutes, ot_day, next_ot_day):
+    """Split a shift into (regular, overtime, weekend/holiday minutes).
+
+    A shift that runs past midnight is cut there and each part is counted
+    by its own day: ``ot_day`` classifies the day it starts on and
+    ``next_ot_day`` the day after. Weekend and holiday minutes are all
+    overtime; the other minutes follow the regular cap and overtime
+    threshold. When both days are of the same kind this is split_minutes.
+    """
+    first_day = min(total_minutes, MINUTES_PER_DAY - in_minutes)
+    ot_day_minutes = (first_day if ot_day else 0) + (total_minutes - first_day if next_ot_day else 0)
+    return split_worked(total_minutes, ot_day_minutes) + (ot_day_minutes,)
+
+
+def split_worked(total_minutes, ot_day_minutes):
+    """Return the (regular, overtime) minutes of a shift with ``ot_day_minutes`` on weekends and holidays"""
+    weekday, holiday = _active_rules.split_table
+    regular_minutes, ot_minutes = weekday[total_minutes - ot_day_minutes]
+    return regular_minutes, ot_minutes + holiday[ot_day_minutes][1]
+
+
+def crosses_midnight(in_minutes, total_minutes):
+    return in_minutes + total_minutes > MINUTES_PER_DAY
+
+
+def shift_minutes(in_minutes, out_minutes):
+    """Return the length of a shift, rolling over midnight if needed"""
+    total_minutes = out_minutes - in_minutes
+    if total_minutes < 0:
+        total_minutes += MINUTES_PER_DAY
+    return total_minutes
+
+
+def compute_entry(date, in_time, out_time, holidays=()):
+    """Compute one punch from its Date, In Time and Out Time strings.
+
+    Raises ValueError if any of the strings is malformed.
+    """
+    in_minutes = parse_time(in_time)
+    total_minutes = shift_minutes(in_minutes, parse_time(out_time))
+    day = parse_date(date)
+    ot_day = is_ot_day(day, holidays)
+    next_ot_day = is_ot_day(day + ONE_DAY, holidays) if crosses_midnight(in_minutes, total_minutes) else ot_day
+    regular_minutes, ot_minutes, ot_day_minutes = split_shift(in_minutes, total_minutes, ot_day, next_ot_day)
+    night_minutes = _active_rules.night_minutes(in_minutes, total_minutes)
+    return EntryResult(date, in_time, out_time, total_minutes, regular_minutes, ot_minutes, ot_day, night_minutes,
+                       ot_day_minutes)
+
+
+def compute_entries(entries, holidays=()):
+    """Compute a batch of punches, collecting errors instead of stopping.
+
+    ``entries`` is an iterable of (date, in_time, out_time) tuples or of
+    mappings with Date, In Time and Out Time keys. Returns a list of
+    EntryResult and a list of EntryError for the entries that failed. A
+    weekly cap, if the rules have one, is applied in entry order.
+    """
+    results = []
+    errors = []
+    weekly_cap = WeeklyCap.for_rules()
+    for index, entry in enumerate(entries):
+        try:
+            if hasattr(entry, "keys"):
+                date, in_time, out_time = entry["Date"], entry["In Time"], entry["Out Time"]
+            else:
+                date, in_time, out_time = entry
+            result = compute_entry(date, in_time, out_time, holidays)
+            if weekly_cap is not None:
+                result = weekly_cap.apply_result(result)
+            results.append(result)
+        except (KeyError, TypeError, ValueError) as e:
+            errors.append(EntryError(index, entry, str(e)))
+    return results, errors
+
+
+def credit(regular_minutes, ot_minutes, ot_day_minutes, night_minutes=0):
+    """Return the (total, regular, overtime) minutes credited for a shift.
+
+    Every minute worked on a weekend or holiday is credited as overtime,
+    unrounded; on other days the regular and counted overtime minutes are
+    credited. A night premium adds to the overtime.
+    """
+    ot_minutes += ot_day_minutes - _active_rules.split_table[1][ot_day_minutes][1]
+    if night_minutes and _active_rules.premium_table is not None:
+        ot_minutes += _active_rules.premium_table[night_minutes]
+    return regular_minutes + ot_minutes, regular_minutes, ot_minutes
+
+
+def credited_minutes(result):
+    """Return the (total, regular, overtime) minutes a result adds to the totals"""
+    return credit(result.regular_minutes, result.ot_minutes, result.ot_day_minutes, result.night_minutes)
@@ -0,0 +1,266 @@
+"""Columnar, array-backed store for computed punches.
+
+Each column is an ``array.array``: dates are kept as ordinals and times as
+integer minutes, so exporting, reporting and deleting rows never has to go
+back to display strings. Unparseable times are stored as -1. Employee IDs
+are interned process-wide into small integer codes, with code 0 for "".
+"""
+import threading
+from array import array
+from datetime import date
+from itertools import compress, islice
+
+from otcalc.aggregates import week_key
+from otcalc.rules import (
+    WeeklyCap,
+    credit,
+    crosses_midnight,
+    format_hhmm,
+    format_time,
+    get_rules,
+    parse_date,
+    parse_time,
+    split_shift,
+    split_worked,
+)
+
+# Column name -> array typecode
+COLUMNS = {
+    "date": "i",          # date ordinal
+    "in_minutes": "h",    # minutes after midnight, -1 if invalid
+    "out_minutes": "h",
+    "total": "h",         # worked minutes
+    "regular": "h",       # regular minutes
+    "overtime": "h",      # counted overtime minutes
+    "ot_day": "b",        # 1 if the shift starts on a weekend or holiday
+    "employee": "i",      # interned employee code
+    "ot_day_minutes": "h",  # minutes worked on weekends and holidays
+    "night_minutes": "h",   # minutes inside the night window
+}
+
+DISPLAY_HEADER = ["Employee", "Date", "In Time", "Out Time", "Work Hours", "Overtime"]
+
+_employee_names = [""]
+_employee_codes = {"": 0}
+_employee_lock = threading.Lock()
+
+
+def employee_code(name):
+    """Return the integer code for an employee ID, interning it if new"""
+    code = _employee_codes.get(name)
+    if code is None:
+        with _employee_lock:
+            code = _employee_codes.get(name)
+            if code is None:
+                code = _employee_codes[name] = len(_employee_names)
+                _employee_names.append(name)
+    return code
+
+
+def employee_name(code):
+    return _employee_names[code]
+
+
+class EntryStore:
+    """Table of punches stored as one typed array per column.
+
+    A date index (ordinal -> row indices) is built the first time it is
+    needed and kept up to date on appends; deleting rows drops it.
+    """
+    __slots__ = tuple(COLUMNS) + ("_by_date",)
+
+    def __init__(self):
+        for name, typecode in COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self._by_date = None
+
+    def __len__(self):
+        return len(self.date)
+
+    def columns(self):
+        return [getattr(self, name) for name in COLUMNS]
+
+    def append(self, date_ordinal, in_minutes, out_minutes, total, regular, overtime, ot_day, employee=0,
+               ot_day_minutes=None, night_minutes=0):
+        """Append a row; ``ot_day_minutes`` defaults to the whole shift on an OT day"""
+        if ot_day_minutes is None:
+            ot_day_minutes = total if ot_day else 0
+        if self._by_date is not None:
+            self._by_date.setdefault(date_ordinal, []).append(len(self))
+        for column, value in zip(self.columns(), (date_ordinal, in_minutes, out_minutes, total, regular, overtime,
+                                                  ot_day, employee, ot_day_minutes, night_minutes)):
+            column.append(value)
+
+    def append_result(self, result, employee=0):
+        """Append a valid otcalc.rules.EntryResult for an employee code"""
+        self.append(parse_date(result.date).toordinal(), parse_time(result.in_time), parse_time(result.out_time),
+                    result.total_minutes, result.regular_minutes, result.ot_minutes, int(result.ot_day), employee,
+                    result.ot_day_minutes, result.night_minutes)
+
+    def extend(self, other):
+        """Append every row of another store"""
+        start = len(self)
+        for mine, theirs in zip(self.columns(), other.columns()):
+            mine.extend(theirs)
+        self._index_from(start)
+
+    def extend_frame(self, result):
+        """Append the rows of a frame from otcalc.engine.compute_frame"""
+        import numpy as np
+
+        sources = {
+            "date": result["date_ordinal"],
+            "in_minutes": result["in_minutes"],
+            "out_minutes": result["out_minutes"],
+            "total": result["total_minutes"],
+            "regular": result["regular_minutes"],
+            "overtime": result["ot_minutes"],
+            "ot_day": result["ot_day"],
+            "employee": result["employee"] if "employee" in result else np.zeros(len(result), dtype=np.int32),
+            "ot_day_minutes": (result["ot_day_minutes"] if "ot_day_minutes" in result
+                               else np.where(result["ot_day"], result["total_minutes"], 0)),
+            "night_minutes": (result["night_minutes"] if "night_minutes" in result
+                              else np.zeros(len(result), dtype=np.int16)),
+        }
+        for name, typecode in COLUMNS.items():
+            column = getattr(self, name)
+            dtype = np.dtype(f"i{column.itemsize}")
+            column.frombytes(np.asarray(sources[name]).astype(dtype).tobytes())
+        self._index_from(len(self) - len(result))
+
+    @classmethod
+    def from_frame(cls, result):
+        store = cls()
+        store.extend_frame(result)
+        return store
+
+    def copy(self):
+        store = EntryStore()
+        for name, typecode in COLUMNS.items():
+            setattr(store, name, array(typecode, getattr(self, name)))
+        return store
+
+    def delete(self, indices):
+        """Delete rows by index in one pass over each column"""
+        doomed = set(indices)
+        keep = [i not in doomed for i in range(len(self))]
+        for name, typecode in COLUMNS.items():
+            setattr(self, name, array(typecode, compress(getattr(self, name), keep)))
+        self._by_date = None
+
+    def clear(self):
+        for name, typecode in COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self._by_date = None
+
+    def indices_on(self, ordinal):
+        """Return the indices of the rows dated ``ordinal``"""
+        if self._by_date is None:
+            self._by_date = {}
+            self._index_from(0)
+        return self._by_date.get(ordinal, [])
+
+    def date_order(self):
+        """Return row indices in date order (stable for equal dates)"""
+        dates = self.date
+        if all(a <= b for a, b in zip(dates, islice(dates, 1, None))):
+            return range(len(self))
+        return array("i", sorted(range(len(self)), key=dates.__getitem__))
+
+    def _index_from(self, start):
+        if self._by_date is None:
+            return
+        by_date = self._by_date
+        for index in range(start, len(self)):
+            by_date.setdefault(self.date[index], []).append(index)
+
+    def crosses_midnight(self, index):
+        return crosses_midnight(self.in_minutes[index], self.total[index])
+
+    def classify(self, index, ot_day, next_ot_day=None):
+        """Return (regular, overtime, ot_day_minutes) for a row with its days classified.
+
+        ``next_ot_day`` classifies the day after, for a shift that runs past
+        midnight; it defaults to ``ot_day``.
+        """
+        return split_shift(max(self.in_minutes[index], 0), self.total[index], ot_day,
+                           ot_day if next_ot_day is None else next_ot_day)
+
+    def set_ot_day(self, index, ot_day, next_ot_day=None):
+        """Reclassify a row and recompute its regular and overtime minutes"""
+        self.ot_day[index] = int(ot_day)
+        self.regular[index], self.overtime[index], self.ot_day_minutes[index] = self.classify(
+            index, ot_day, next_ot_day)
+
+    def week_indices(self, weeks):
+        """Return the indices of the rows in ``weeks``, (employee code, Monday ordinal) pairs, in date and time order"""
+        indices = []
+        for employee, monday in weeks:
+            for ordinal in range(monday, monday + 7):
+                indices.extend(index for index in self.indices_on(ordinal) if self.employee[index] == employee)
+        indices.sort(key=lambda index: (self.date[index], self.in_minutes[index]))
+        return indices
+
+    def apply_weekly_cap(self, indices=None):
+        """Recompute regular and overtime minutes, with the weekly cap if the rules have one.
+
+        ``indices`` must hold whole (employee, week) groups in date and time
+        order, as week_indices returns them; by default every row is
+        recomputed.
+        """
+        if indices is None:
+            indices = sorted(range(len(self)), key=lambda index: (self.date[index], self.in_minutes[index]))
+        weekly_cap = WeeklyCap.for_rules()
+        for index in indices:
+            regular, overtime = split_worked(self.total[index], self.ot_day_minutes[index])
+            if weekly_cap is not None:
+                regular, overtime = weekly_cap.apply(self.employee[index], self.date[index], regular, overtime)
+            self.regular[index], self.overtime[index] = regular, overtime
+
+    def weeks(self, indices):
+        """Return the (employee code, Monday ordinal) pairs of rows"""
+        return {(self.employee[index], week_key(self.date[index])) for index in indices}
+
+    def credited(self, index):
+        """Return the (total, regular, overtime) minutes a row adds to the totals"""
+        return credit(self.regular[index], self.overtime[index], self.ot_day_minutes[index],
+                      self.night_minutes[index])
+
+    def iter_credited(self):
+        """Yield (employee code, date ordinal, total, regular, overtime) credited minutes per row"""
+        rules = get_rules()
+        holiday = rules.split_table[1]
+        premium = rules.premium_table
+        if premium is None:
+            for employee, ordinal, regular, overtime, ot_day_minutes in zip(
+                    self.employee, self.date, self.regular, self.overtime, self.ot_day_minutes):
+                if ot_day_minutes:
+                    overtime += ot_day_minutes - holiday[ot_day_minutes][1]
+                yield employee, ordinal, regular + overtime, regular, overtime
+            return
+        for employee, ordinal, regular, overtime, ot_day_minutes, night_minutes in zip(
+                self.employee, self.date, self.regular, self.overtime, self.ot_day_minutes, self.night_minutes):
+            overtime += ot_day_minutes - holiday[ot_day_minutes][1] + premium[night_minutes]
+            yield employee, ordinal, regular + overtime, regular, overtime
+
+    def employees(self):
+        """Return the employee IDs present in the store, sorted"""
+        return sorted(employee_name(code) for code in set(self.employee))
+
+    def display_row(self, index):
+        """Return a row as Employee / Date / In Time / Out Time / Work Hours / Overtime strings"""
+        in_minutes = self.in_minutes[index]
+        out_minutes = self.out_minutes[index]
+        return (
+            employee_name(self.employee[index]),
+            date.fromordinal(self.date[index]).isoformat(),
+            format_time(in_minutes) if in_minutes >= 0 else "",
+            format_time(out_minutes) if out_minutes >= 0 else "",
+            format_hhmm(self.total[index]),
+            format_hhmm(self.overtime[index]),
+        )
+
+    def iter_display(self):
+        """Yield every row as display strings"""
+        for index in range(len(self)):
+            yield self.display_row(index)
@@ -0,0 +1,68 @@
+"""Background tasks whose messages are picked up by a UI thread.
+
+A task runs its target on a worker thread. The target receives the task
+itself and reports back with ``task.post(kind, payload)``; the UI drains
+the queue from its own event loop (for Tk, with ``root.after``), so no
+widget is ever touched from the worker.
+"""
+import queue
+import threading
+import time
+
+from otcalc.instrument import profile_thread
+
+
+class BackgroundTask:
+    """Run ``target(task, *args)`` on a worker thread.
+
+    When the target returns, a final "done" message carries its return
+    value, or "cancelled" if ``cancel()`` was called; an exception is
+    posted as "error".
+    """
+    def __init__(self, target, *args):
+        self.target = target
+        self.args = args
+        self.queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.started = None
+    
+    def start(self):
+        self.started = time.monotonic()
+        self.thread.start()
+    
+    def cancel(self):
+        """Ask the target to stop at its next checkpoint"""
+        self.cancel_event.set()
+    
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+    
+    @property
+    def running(self):
+        return self.thread.is_alive()
+    
+    def elapsed(self):
+        """Seconds since the task started"""
+        return time.monotonic() - self.started if self.started else 0.0
+    
+    def post(self, kind, payload=None):
+        self.queue.put((kind, payload))
+    
+    def drain(self):
+        """Return every message posted since the last call, without blocking"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.queue.get_nowait())
+            except queue.Empty:
+                return messages
+    
+    def _run(self):
+        try:
+            result = profile_thread(self.target, self, *self.args)
+        except Exception as e:
+            self.post("error", e)
+        else:
+            self.post("cancelled" if self.cancelled else "done", result)
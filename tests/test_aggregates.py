@@ -0,0 +1,32 @@
+import random
+
+from otcalc.aggregates import EmployeeAggregates, day_totals
+from otcalc.engine import compute_frame
+from otcalc.store import EntryStore
+from tests.test_rules import HOLIDAYS, random_punches
+
+
+def test_add_and_remove_keep_matching_a_recompute():
+    punches = random_punches(3_000, seed=3)
+    punches["Employee"] = [f"E{i % 7}" for i in range(len(punches))]
+    store = EntryStore.from_frame(compute_frame(punches, HOLIDAYS))
+    aggregates = EmployeeAggregates()
+    aggregates.add_days(day_totals(store))
+    assert aggregates.verify(store)
+    for level in (aggregates.all.days, aggregates.all.weeks, aggregates.all.months, aggregates.all.periods):
+        assert [sum(bucket[i] for bucket in level.values()) for i in range(4)] == aggregates.all.grand
+
+    rng = random.Random(3)
+    for _ in range(5):
+        doomed = rng.sample(range(len(store)), 200)
+        for index in doomed:
+            aggregates.remove(store.employee[index], store.date[index], *store.credited(index))
+        store.delete(doomed)
+        assert aggregates.verify(store)
+    assert aggregates.all.grand[0] == len(store) == 2_000
+
+    for index in range(len(store)):
+        aggregates.remove(store.employee[index], store.date[index], *store.credited(index))
+    # Emptied buckets are dropped rather than left at zero
+    assert aggregates.all.grand == [0, 0, 0, 0]
+    assert (aggregates.all.days, aggregates.all.weeks, aggregates.employees) == ({}, {}, {})
@@ -0,0 +1,23 @@
+from otcalc.batch import run_batch
+from otcalc.importer import stream_totals
+from tests.test_rules import HOLIDAYS, random_punches
+
+
+def test_worker_count_does_not_change_results(tmp_path):
+    paths = []
+    for seed in range(5):
+        path = tmp_path / f"E{1000 + seed}.csv"
+        random_punches(2_000, seed=seed).to_csv(path, index=False)
+        with open(path, "a") as f:
+            f.write("2024-03-05,bad,05:00 PM\n")
+        paths.append(str(path))
+
+    serial = run_batch(paths, HOLIDAYS, workers=1, chunksize=300)
+    assert run_batch(paths, HOLIDAYS, workers=3, chunksize=300) == serial
+    for path, (employee, summary, days, error) in zip(paths, serial):
+        assert error is None and path.endswith(f"{employee}.csv")
+        errors = summary.pop("errors")
+        assert summary == stream_totals(path, HOLIDAYS).as_dict()
+        assert [e.line for e in errors] == [2_002]
+        assert [sum(day[i] for day in days.values()) for i in range(3)] == \
+            [summary["total"], summary["regular"], summary["overtime"]]
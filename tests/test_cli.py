@@ -0,0 +1,17 @@
+import io
+
+from otcalc.cli import process
+
+
+def test_bad_rows_are_reported_with_their_file_line(capsys):
+    punches = io.StringIO(
+        'Date,In Time,Out Time,Note\n'
+        '2024-03-04,08:00 AM,05:00 PM,x\n'
+        '2024-03-05,08:00 AM,05:00 PM,"two\nlines"\n'
+        '\n'
+        '2024-03-06,bad,05:00 PM,y\n'
+    )
+    totals = {}
+    assert process(punches, "p.csv", (), totals) == 1
+    assert capsys.readouterr().err.startswith("p.csv:6: ")
+    assert totals[""][:2] == [2, 1080]
@@ -0,0 +1,34 @@
+import pytest
+
+from otcalc import columnar
+from otcalc.engine import compute_frame
+from otcalc.store import COLUMNS, EntryStore
+from tests.test_rules import HOLIDAYS, random_punches
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture(scope="module")
+def punches():
+    punches = random_punches(3_000, seed=5)
+    punches["Employee"] = [f"E{i % 4}" for i in range(len(punches))]
+    return punches
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".arrow"])
+def test_round_trip(tmp_path, punches, extension):
+    path = str(tmp_path / f"entries{extension}")
+    store = EntryStore.from_frame(compute_frame(punches, HOLIDAYS))
+    columnar.save(store, path)
+
+    loaded = columnar.load_store(path, HOLIDAYS)
+    for name in COLUMNS:
+        assert getattr(loaded, name) == getattr(store, name), name
+    # The rules are re-applied on load, so a holiday calendar change shows up
+    assert columnar.load_store(path).overtime == EntryStore.from_frame(compute_frame(punches)).overtime
+
+    frame = columnar.read_frame(path, ["Date", "Overtime Minutes"])
+    assert list(frame.columns) == ["Date", "Overtime Minutes"]
+    assert frame["Overtime Minutes"].tolist() == store.overtime.tolist()
+    assert [day.toordinal() for day in frame["Date"].dt.date] == store.date.tolist()
+    assert set(columnar.read_frame(path, ["Employee"])["Employee"]) == {"E0", "E1", "E2", "E3"}
@@ -0,0 +1,79 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from otcalc.aggregates import week_key
+from otcalc.db import TimecardDB
+from otcalc.engine import apply_weekly_cap, compute_frame
+from otcalc.rules import RuleSet, WeeklyCap, set_rules
+from otcalc.store import EntryStore, employee_name
+
+
+@pytest.fixture
+def rules():
+    """Install a RuleSet for one test"""
+    yield set_rules
+    set_rules(None)
+
+
+def ordinal(day):
+    return date.fromisoformat(day).toordinal()
+
+
+def test_load_range_includes_start_and_excludes_end():
+    punches = pd.DataFrame([
+        ("E1", "2024-02-29", "08:00 AM", "05:00 PM"),
+        ("E1", "2024-03-01", "08:00 AM", "05:00 PM"),
+        ("E2", "2024-03-01", "09:00 AM", "01:00 PM"),
+        ("E1", "2024-03-08", "10:00 PM", "06:00 AM"),  # Friday night, into the weekend
+        ("E1", "2024-03-09", "08:00 AM", "05:00 PM"),
+        ("E1", "2024-12-31", "08:00 AM", "05:00 PM"),
+        ("E1", "2025-01-01", "08:00 AM", "05:00 PM"),
+    ], columns=["Employee", "Date", "In Time", "Out Time"])
+    stored = EntryStore.from_frame(compute_frame(punches))
+    db = TimecardDB(":memory:")
+    db.add_store(stored)
+    db.add_store(stored)  # re-importing adds nothing
+
+    def dates(store):
+        return [date.fromordinal(day).isoformat() for day in store.date]
+
+    loaded = db.load_range(None, ordinal("2024-03-01"), ordinal("2024-03-09"))
+    assert dates(loaded) == ["2024-03-01", "2024-03-01", "2024-03-08"]
+    assert [employee_name(code) for code in loaded.employee] == ["E1", "E2", "E1"]
+    # The hours after midnight fall on the Saturday past the range and are still weekend overtime
+    assert (loaded.regular[2], loaded.overtime[2], loaded.ot_day_minutes[2]) == \
+        (stored.regular[3], stored.overtime[3], stored.ot_day_minutes[3]) == (120, 360, 360)
+    assert dates(db.load_range("E2", ordinal("2024-03-01"), ordinal("2024-03-02"))) == ["2024-03-01"]
+    assert len(db.load_range(None, ordinal("2024-03-02"), ordinal("2024-03-08"))) == 0
+
+    assert dates(db.load_month("E1", 2024, 2)) == ["2024-02-29"]
+    assert dates(db.load_month("E1", 2024, 12)) == ["2024-12-31"]
+    assert dates(db.load_month(None, 2025, 1)) == ["2025-01-01"]
+
+
+def test_weekly_cap_survives_reload(rules):
+    rules(RuleSet(weekly_regular_cap_minutes=1800))
+    punches = pd.DataFrame({
+        "Employee": "E1",
+        "Date": [f"2024-03-0{day}" for day in range(4, 9)],
+        "In Time": "08:00 AM",
+        "Out Time": "05:00 PM",
+    })
+    frame = compute_frame(punches)
+    apply_weekly_cap(frame, WeeklyCap.for_rules())
+    assert (frame["regular_minutes"].sum(), frame["ot_minutes"].sum()) == (1800, 900)
+
+    db = TimecardDB(":memory:")
+    db.add_store(EntryStore.from_frame(frame))
+    loaded = db.load_range(None, 0, date(2025, 1, 1).toordinal())
+    assert (sum(loaded.regular), sum(loaded.overtime)) == (1800, 900)
+    # A range starting mid-week still counts the days before it
+    wednesday = date(2024, 3, 6).toordinal()
+    loaded = db.load_range(None, wednesday, date(2025, 1, 1).toordinal())
+    assert list(loaded.regular) == [465, 405, 0]
+
+    store = EntryStore.from_frame(frame)
+    store.apply_weekly_cap(store.week_indices({(store.employee[0], week_key(wednesday))}))
+    assert (sum(store.regular), sum(store.overtime)) == (1800, 900)
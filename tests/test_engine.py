@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from otcalc.aggregates import day_totals
+from otcalc.engine import compute_frame, store_frame, summarize_by_employee, summarize_days
+from otcalc.rules import RuleSet, compute_entry, set_rules
+from otcalc.store import EntryStore
+
+
+@pytest.fixture
+def rules():
+    """Install a RuleSet for one test"""
+    yield set_rules
+    set_rules(None)
+
+
+@pytest.mark.parametrize("options, punch", [
+    ({"regular_cap_minutes": 0, "ot_threshold_minutes": 0, "ot_step_minutes": 1000, "rounding": "up"},
+     ("2024-03-04", "06:00 AM", "11:00 PM")),
+    # Weekday and weekend parts of a Friday night shift are each rounded up
+    ({"regular_cap_minutes": 0, "ot_threshold_minutes": 0, "rounding": "up"}, ("2024-03-08", "12:07 AM", "12:01 AM")),
+])
+def test_overtime_past_a_day_is_formatted(rules, options, punch):
+    rules(RuleSet(**options))
+    result = compute_frame(pd.DataFrame([punch], columns=["Date", "In Time", "Out Time"]))
+    expected = compute_entry(*punch)
+    assert expected.ot_minutes > 24 * 60
+    assert result["ot_minutes"].tolist() == [expected.ot_minutes]
+    assert result["Overtime"].tolist() == [f"{expected.ot_minutes // 60:02d}:{expected.ot_minutes % 60:02d}"]
+
+
+def test_summaries_match_the_store(rules):
+    rules(RuleSet(night_start="10:00 PM", night_end="06:00 AM", night_premium_percent=25))
+    frame = compute_frame(pd.DataFrame({
+        "Employee": ["E1", "E2", "E1", "E1"],
+        "Date": ["2024-03-08", "2024-03-08", "2024-03-08", "2024-03-09"],
+        "In Time": ["10:00 PM", "08:00 AM", "07:00 AM", "bad"],
+        "Out Time": ["06:00 AM", "06:30 PM", "09:00 AM", "05:00 PM"],
+    }))
+    store = EntryStore.from_frame(frame)
+    assert summarize_days(frame) == day_totals(store)
+    assert summarize_days(store_frame(store)) == day_totals(store)
+    by_employee = summarize_by_employee(frame)
+    assert by_employee.loc["E1", "rows"] == 3
+    assert by_employee["total"].sum() == sum(days[1] for days in day_totals(store).values())
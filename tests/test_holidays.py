@@ -0,0 +1,86 @@
+import importlib.util
+import os
+from datetime import date
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from otcalc.aggregates import EmployeeAggregates, day_totals
+from otcalc.engine import compute_frame
+from otcalc.holidays import HolidayManager
+from otcalc.rules import RuleSet, set_rules
+from otcalc.store import EntryStore
+from tests.test_rules import HOLIDAYS, random_punches
+
+NEW_HOLIDAY = date(2024, 3, 13)
+
+
+@pytest.fixture(scope="module")
+def app():
+    """The app script, imported under a module name"""
+    pytest.importorskip("tkinter")
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "OT time-calculate.py")
+    spec = importlib.util.spec_from_file_location("ot_time_calculate", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def rules():
+    """Install a RuleSet for one test"""
+    yield set_rules
+    set_rules(None)
+
+
+def recompute(punches, holidays):
+    """Store and aggregates rebuilt from scratch with ``holidays``"""
+    store = EntryStore.from_frame(compute_frame(punches, holidays))
+    store.apply_weekly_cap()
+    aggregates = EmployeeAggregates()
+    aggregates.add_days(day_totals(store))
+    return store, aggregates
+
+
+def same_rows(store, other):
+    return all(getattr(store, name) == getattr(other, name)
+               for name in ("ot_day", "regular", "overtime", "ot_day_minutes"))
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"weekly_regular_cap_minutes": 1800, "night_start": "10:00 PM", "night_end": "06:00 AM",
+     "night_premium_percent": 25},
+])
+def test_holiday_change_matches_a_full_recompute(app, rules, options):
+    rules(RuleSet(**options))
+    punches = pd.concat([random_punches(2_000, seed=4), pd.DataFrame([
+        ("2024-03-12", "10:00 PM", "06:00 AM"),  # the night before, into the holiday
+        ("2024-03-13", "08:00 AM", "05:00 PM"),
+        ("2024-03-13", "10:00 PM", "06:00 AM"),  # from the holiday into a weekday
+    ], columns=["Date", "In Time", "Out Time"])], ignore_index=True)
+    punches["Employee"] = [f"E{i % 3}" for i in range(len(punches))]
+
+    store, aggregates = recompute(punches, HOLIDAYS)
+    manager = HolidayManager()
+    for day in HOLIDAYS:
+        manager.add_holiday(day)
+    fake = SimpleNamespace(entries=store, aggregates=aggregates, holiday_manager=manager,
+                           table=SimpleNamespace(schedule_refresh=lambda: None), refresh_totals=lambda: None)
+    fake.update_weeks = lambda weeks, change=None: app.TimeCardApp.update_weeks(fake, weeks, change)
+    manager.add_listener(lambda day: app.TimeCardApp.reclassify_date(fake, day))
+
+    overnight = len(punches) - 3
+    assert store.ot_day_minutes[overnight] == 0
+    manager.add_holiday(NEW_HOLIDAY)
+    expected, expected_aggregates = recompute(punches, HOLIDAYS | {NEW_HOLIDAY})
+    assert same_rows(store, expected)
+    assert aggregates.all == expected_aggregates.all and aggregates.employees == expected_aggregates.employees
+    # The hours after midnight of the night before are now holiday hours
+    assert (store.ot_day[overnight], store.ot_day_minutes[overnight]) == (0, 360)
+
+    manager.remove_holiday(NEW_HOLIDAY)
+    expected, _ = recompute(punches, HOLIDAYS)
+    assert same_rows(store, expected)
+    assert aggregates.verify(store)
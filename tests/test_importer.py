@@ -0,0 +1,33 @@
+from otcalc.importer import AppendReader, stream_totals
+from tests.test_rules import HOLIDAYS, random_punches
+
+
+def test_readers_agree(tmp_path):
+    path = tmp_path / "punches.csv"
+    random_punches(5_000, seed=2).to_csv(path, index=False)
+    with open(path, "a") as f:
+        f.write("\n2024-03-05,08:00 AM\n\n")
+    assert stream_totals(path, HOLIDAYS, 700).as_dict() == stream_totals(path, HOLIDAYS, use_pandas=False).as_dict()
+    collected = stream_totals(path, HOLIDAYS, 700, collect_errors=True)
+    assert collected.as_dict() == stream_totals(path, HOLIDAYS, use_pandas=False, collect_errors=True).as_dict()
+    assert [(e.line, e.column) for e in collected.errors] == [(5003, "Out Time")]
+
+
+def test_append_reader_keeps_a_line_cut_mid_write(tmp_path):
+    path = tmp_path / "growing.csv"
+    path.write_bytes(b"Date,In Time,Out Time\n2024-03-01,08:00 AM,05:00 PM\n2024-03-02,08:30 AM,05")
+
+    def read(state):
+        errors = []
+        with AppendReader(str(path), state) as reader:
+            rows = [row for chunk in reader.iter_chunks(errors=errors) for row in chunk["Date"]]
+            return rows, reader.state()
+
+    rows, state = read(None)
+    assert rows == ["2024-03-01"]
+    with open(path, "ab") as f:
+        f.write(b":30 PM\n2024-03-04,08:00 AM,04:00 PM\n")
+    rows, state = read(state)
+    assert rows == ["2024-03-02", "2024-03-04"]
+    rows, state = read(state)
+    assert rows == []
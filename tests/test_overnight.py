@@ -0,0 +1,21 @@
+from otcalc.rules import compute_entry, credited_minutes
+from tests.test_rules import HOLIDAYS
+
+FRIDAY, SUNDAY = "2024-03-08", "2024-03-10"
+
+
+def test_friday_night_shift_is_weekend_overtime_after_midnight():
+    result = compute_entry(FRIDAY, "10:00 PM", "06:00 AM")
+    assert (result.regular_minutes, result.ot_minutes, result.ot_day_minutes) == (120, 360, 360)
+    assert credited_minutes(result) == (480, 120, 360)
+
+
+def test_sunday_night_shift_is_weekday_hours_after_midnight():
+    result = compute_entry(SUNDAY, "10:00 PM", "08:00 AM")
+    # 120 weekend minutes, then 480 on Monday: 465 regular and 15 short of the threshold
+    assert (result.regular_minutes, result.ot_minutes, result.ot_day_minutes) == (465, 120, 120)
+
+
+def test_shift_into_a_holiday_is_split():
+    result = compute_entry("2024-07-03", "09:00 PM", "05:00 AM", HOLIDAYS)
+    assert (result.regular_minutes, result.ot_minutes, result.ot_day_minutes) == (180, 300, 300)
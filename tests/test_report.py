@@ -0,0 +1,41 @@
+from datetime import date, datetime
+
+from otcalc.aggregates import week_key
+from otcalc.engine import compute_frame
+from otcalc.report import ROW_FORMAT, iter_report
+from otcalc.rules import format_hhmm
+from otcalc.store import EntryStore
+from tests.test_rules import HOLIDAYS, random_punches
+
+
+def test_pages_and_subtotals():
+    store = EntryStore.from_frame(compute_frame(random_punches(1_000, seed=6), HOLIDAYS))
+    weeks, months = {}, {}
+    for _, ordinal, total, _, overtime in store.iter_credited():
+        day = date.fromordinal(ordinal)
+        for totals, key in ((weeks, f"Week of {date.fromordinal(week_key(ordinal)).isoformat()}"),
+                            (months, f"Month {day.year}-{day.month:02d}")):
+            bucket = totals.setdefault(key, [0, 0])
+            bucket[0] += total
+            bucket[1] += overtime
+    grand_total = sum(total for total, _ in months.values())
+    grand_overtime = sum(overtime for _, overtime in months.values())
+
+    pages = list(iter_report(store, grand_total, grand_overtime, page_lines=25,
+                             generated=datetime(2024, 12, 31, 17, 0)))
+    body = []
+    for number, page in enumerate(pages, 1):
+        lines = page.splitlines()
+        assert len(lines) == 25 or number == len(pages)
+        assert lines[2] == "Generated on: 2024-12-31 17:00:00"
+        assert lines[-1].strip() == f"Page {number}"
+        body.extend(lines[6:-1])
+
+    entries = body[:body.index("Summary:")]
+    subtotals = {line[2:46].strip(): (line[46:63].strip(), line[63:].strip())
+                 for line in entries if line.startswith(("  Week of", "  Month"))}
+    rows = [line for line in entries if line and line[2:46].strip() not in subtotals]
+    assert rows == [ROW_FORMAT.format(*store.display_row(index)) for index in store.date_order()]
+    assert subtotals == {label: (format_hhmm(total), format_hhmm(overtime))
+                         for totals in (weeks, months) for label, (total, overtime) in totals.items()}
+    assert f"Total Work Hours: {grand_total / 60:.2f} hours" in body
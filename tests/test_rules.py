@@ -0,0 +1,72 @@
+"""Checks that the rules keep matching the original calculator.
+
+``original_hours`` is the arithmetic of the app's first
+``calculate_hours``; every path must agree with it except where a shift
+crosses into a day of the other kind, which is split at midnight.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from otcalc.engine import compute_frame
+from otcalc.rules import compute_entry, is_ot_day
+
+HOLIDAYS = frozenset({date(2024, 7, 4), date(2024, 12, 25)})
+
+
+def original_hours(in_time, out_time, day, holidays):
+    """(total, regular, overtime) minutes as calculate_hours computed them"""
+    in_dt = datetime.strptime(in_time, "%I:%M %p")
+    out_dt = datetime.strptime(out_time, "%I:%M %p")
+    if out_dt < in_dt:
+        out_dt += timedelta(days=1)
+    total = int((out_dt - in_dt).total_seconds() // 60)
+    day = datetime.strptime(day, "%Y-%m-%d").date()
+    if day.weekday() in (5, 6) or day in holidays:
+        return total, 0, total // 15 * 15
+    regular = min(465, total)
+    raw_ot = max(0, total - 465)
+    return total, regular, 0 if raw_ot < 60 else raw_ot // 15 * 15
+
+
+def random_punches(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        day = (date(2024, 1, 1) + timedelta(days=rng.randrange(366))).isoformat()
+        in_time, out_time = (f"{rng.randint(1, 12):02d}:{rng.choice((0, 7, 15, 30, 45)):02d} {rng.choice(('AM', 'PM'))}"
+                             for _ in range(2))
+        rows.append((day, in_time, out_time))
+    return pd.DataFrame(rows, columns=["Date", "In Time", "Out Time"])
+
+
+def splits_days(day, in_time, out_time, holidays):
+    """True for a shift that runs into a day of the other kind"""
+    start = datetime.strptime(in_time, "%I:%M %p")
+    if datetime.strptime(out_time, "%I:%M %p") >= start:
+        return False
+    day = date.fromisoformat(day)
+    return is_ot_day(day, holidays) != is_ot_day(day + timedelta(days=1), holidays)
+
+
+def test_compute_entry_matches_original():
+    checked = 0
+    for day, in_time, out_time in random_punches(20_000).itertuples(index=False):
+        if splits_days(day, in_time, out_time, HOLIDAYS):
+            continue
+        result = compute_entry(day, in_time, out_time, HOLIDAYS)
+        assert (result.total_minutes, result.regular_minutes, result.ot_minutes) == \
+            original_hours(in_time, out_time, day, HOLIDAYS)
+        checked += 1
+    assert checked > 15_000
+
+
+def test_compute_frame_matches_compute_entry():
+    punches = random_punches(20_000, seed=1)
+    result = compute_frame(punches, HOLIDAYS)
+    expected = [compute_entry(*row, HOLIDAYS) for row in punches.itertuples(index=False)]
+    assert result["total_minutes"].tolist() == [r.total_minutes for r in expected]
+    assert result["regular_minutes"].tolist() == [r.regular_minutes for r in expected]
+    assert result["ot_minutes"].tolist() == [r.ot_minutes for r in expected]
+    assert result["ot_day_minutes"].tolist() == [r.ot_day_minutes for r in expected]